@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+
+@register()
+def check_fragment_cache(app_configs, **kwargs):
+    if settings.RECIPE_FRAGMENT_CACHE and not settings.SHARED_CACHE:
+        return [Error(
+            'RECIPE_FRAGMENT_CACHE требует общего для процессов кеша',
+            hint='Укажите CACHE_BACKEND и CACHE_LOCATION, например Memcached',
+            id='api.E001',
+        )]
+    return []
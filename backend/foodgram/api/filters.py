@@ -1,17 +1,43 @@
+from django import forms
 from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet
-from django_filters.rest_framework.filters import (AllValuesMultipleFilter,
-                                                   BooleanFilter,
+from django_filters.rest_framework.filters import (BooleanFilter, Filter,
                                                    ModelChoiceFilter)
 
 from recipes.models import Recipe
 
+from .serializers import tag_catalogue
+
 User = get_user_model()
 
 
+class MultipleValueField(forms.Field):
+    widget = forms.SelectMultiple
+
+    def to_python(self, value):
+        return [item for item in value or () if item]
+
+
+class TagsFilter(Filter):
+    field_class = MultipleValueField
+
+    def filter(self, queryset, value):
+        if not value:
+            return queryset
+        slugs = tag_catalogue.get()['slugs']
+        tag_ids = [slugs[slug] for slug in value if slug in slugs]
+        if not tag_ids:
+            return queryset.none()
+        return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe=OuterRef('pk'),
+            tag_id__in=tag_ids
+        )))
+
+
 class RecipeFilter(FilterSet):
     author = ModelChoiceFilter(queryset=User.objects.all())
-    tags = AllValuesMultipleFilter(field_name='tags__slug')
+    tags = TagsFilter()
     is_favorited = BooleanFilter(method='is_favorited_filter')
     is_in_shopping_cart = BooleanFilter(method='is_in_shopping_cart_filter')
 
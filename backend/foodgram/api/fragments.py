@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db.models import Prefetch, prefetch_related_objects
+from foodgram.metrics import count_cache
+from recipes.cache import (INGREDIENTS_VERSION, RECIPE_VERSION, TAGS_VERSION,
+                           USER_VERSION, get_versions)
+from recipes.models import IngredientRecipe
+
+FRAGMENT_KEY = 'recipe_fragment:{}:{}:{}:{}:{}:{}:{}'
+
+
+class AnonymousRequest:
+    """Запрос, от имени которого собирается общая для всех часть рецепта."""
+
+    user = AnonymousUser()
+
+    def __init__(self, request):
+        self._request = request
+
+    def __getattr__(self, name):
+        return getattr(self._request, name)
+
+
+def get_fragment_keys(recipes, request, rendition):
+    version_keys = set((TAGS_VERSION, INGREDIENTS_VERSION))
+    for recipe in recipes:
+        version_keys.add(RECIPE_VERSION.format(recipe.id))
+        version_keys.add(USER_VERSION.format(recipe.author_id))
+    version_keys = tuple(version_keys)
+    versions = dict(zip(version_keys, get_versions(*version_keys)))
+    host = request.get_host() if request else ''
+    return {
+        recipe.id: FRAGMENT_KEY.format(
+            recipe.id,
+            versions[RECIPE_VERSION.format(recipe.id)],
+            versions[USER_VERSION.format(recipe.author_id)],
+            versions[TAGS_VERSION],
+            versions[INGREDIENTS_VERSION],
+            rendition,
+            host
+        )
+        for recipe in recipes
+    }
+
+
+def build_fragments(serializer, recipes, request):
+    prefetch_related_objects(
+        recipes,
+        'author',
+        'tags',
+        Prefetch(
+            'recipe_ingredients',
+            queryset=IngredientRecipe.objects.select_related('ingredient')
+        )
+    )
+    builder = type(serializer)(context=dict(
+        serializer.context,
+        request=AnonymousRequest(request) if request else None
+    ))
+    return [builder.build_fragment(recipe) for recipe in recipes]
+
+
+def get_fragments(serializer, recipes):
+    request = serializer.context.get('request')
+    if not settings.RECIPE_FRAGMENT_CACHE:
+        return build_fragments(serializer, recipes, request)
+    keys = get_fragment_keys(
+        recipes,
+        request,
+        serializer.fields['image'].get_rendition()
+    )
+    fragments = cache.get_many(keys.values())
+    missing = [recipe for recipe in recipes if keys[recipe.id] not in fragments]
+    count_cache(
+        'recipe_fragment',
+        hits=len(recipes) - len(missing),
+        misses=len(missing)
+    )
+    if missing:
+        built = dict(zip(
+            (keys[recipe.id] for recipe in missing),
+            build_fragments(serializer, missing, request)
+        ))
+        cache.set_many(built, settings.RECIPE_FRAGMENT_CACHE_TIMEOUT)
+        fragments.update(built)
+    return [fragments[keys[recipe.id]] for recipe in recipes]
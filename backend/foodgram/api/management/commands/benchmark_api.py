@@ -0,0 +1,358 @@
+import json
+import subprocess
+from base64 import b64encode
+from io import BytesIO
+from statistics import median
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from PIL import Image
+from recipes.models import Basket, Favorites, Ingredient, Recipe, Tag
+from rest_framework.test import APIClient
+from users.models import Follow
+
+User = get_user_model()
+
+
+def get_image():
+    buffer = BytesIO()
+    Image.new('RGB', (800, 600), (120, 180, 90)).save(buffer, 'PNG')
+    return 'data:image/png;base64,' + b64encode(buffer.getvalue()).decode()
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Замер времени ответа и числа запросов к БД для эндпоинтов API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='Очищать кеш перед каждым запросом'
+        )
+        parser.add_argument(
+            '--only',
+            nargs='*',
+            help='Запустить только перечисленные сценарии'
+        )
+        parser.add_argument(
+            '--output',
+            help='Сохранить отчёт в JSON-файл'
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON-отчёт, с которым сравнить результаты'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='Допустимый рост медианы времени ответа, доля'
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('Число итераций должно быть больше нуля')
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']
+        ):
+            report = self.benchmark(options)
+        self.write_report(report, options)
+
+    def benchmark(self, options):
+        self.prepare()
+        scenarios = self.get_scenarios()
+        if options['only']:
+            unknown = set(options['only']) - set(scenarios)
+            if unknown:
+                raise CommandError(
+                    'Неизвестные сценарии: ' + ', '.join(sorted(unknown))
+                )
+            scenarios = {
+                name: scenario for name, scenario in scenarios.items()
+                if name in options['only']
+            }
+        results = {
+            name: self.measure(name, scenario, options)
+            for name, scenario in scenarios.items()
+        }
+        return {
+            'commit': get_commit(),
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'cache': 'cold' if options['cold'] else 'warm',
+            'iterations': options['iterations'],
+            'data': {
+                'users': User.objects.count(),
+                'recipes': Recipe.objects.count(),
+                'ingredients': Ingredient.objects.count(),
+            },
+            'results': results,
+        }
+
+    def write_report(self, report, options):
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        regressions = []
+        if options['baseline']:
+            regressions = self.compare(report, options)
+        else:
+            for name, result in report['results'].items():
+                self.stdout.write(
+                    f'{name:32} {result["median_ms"]:9.2f} ms '
+                    f'p95 {result["p95_ms"]:9.2f} ms '
+                    f'{result["queries"]:4} запросов'
+                )
+        if regressions:
+            raise CommandError(
+                'Производительность ухудшилась: ' + ', '.join(regressions)
+            )
+
+    def prepare(self):
+        self.user = User.objects.annotate(
+            cart=Count('baskets', distinct=True),
+            follows=Count('following', distinct=True)
+        ).filter(cart__gt=0, follows__gt=0).order_by('-cart', 'id').first()
+        if self.user is None:
+            raise CommandError(
+                'Нужна база с подписками и корзинами: '
+                'выполните generate_data'
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.order_by('-id').first()
+        self.free_recipe = Recipe.objects.exclude(
+            favorites__user=self.user
+        ).exclude(baskets__user=self.user).order_by('-id').first()
+        self.author = User.objects.exclude(id=self.user.id).exclude(
+            follower__user=self.user
+        ).order_by('-recipes_count').first()
+        self.followed = Follow.objects.filter(user=self.user).first().author
+        self.tags = list(Tag.objects.values_list('slug', flat=True)[:2])
+        self.ingredients = list(
+            Ingredient.objects.values_list('id', flat=True)[:10]
+        )
+        self.image = get_image()
+        self.feed_page = self.client.get(
+            '/api/recipes/feed/?limit=30'
+        ).json()['next'] or '/api/recipes/feed/'
+
+    def recipe_data(self):
+        return {
+            'name': 'Замер производительности',
+            'text': 'Рецепт для замера',
+            'cooking_time': 15,
+            'image': self.image,
+            'tags': list(Tag.objects.filter(
+                slug__in=self.tags
+            ).values_list('id', flat=True)),
+            'ingredients': [
+                {'id': ingredient_id, 'amount': 10}
+                for ingredient_id in self.ingredients
+            ],
+        }
+
+    def get_scenarios(self):
+        client = self.client
+        recipe = self.recipe.id
+        free = self.free_recipe.id
+        tags = '&'.join(f'tags={slug}' for slug in self.tags)
+
+        def get(url):
+            return lambda: client.get(url)
+
+        def own_recipe():
+            return client.post(
+                '/api/recipes/', self.recipe_data(), format='json'
+            ).json()['id']
+
+        def add(model, recipe_id):
+            return lambda: model.objects.create(
+                user=self.user, recipe_id=recipe_id
+            )
+
+        return {
+            'recipes_list': (get('/api/recipes/'), None, False),
+            'recipes_list_page': (
+                get('/api/recipes/?page=10&limit=6'), None, False
+            ),
+            'recipes_list_cursor': (
+                get('/api/recipes/?pagination=cursor&limit=6'), None, False
+            ),
+            'recipes_list_tags': (get(f'/api/recipes/?{tags}'), None, False),
+            'recipes_list_author': (
+                get(f'/api/recipes/?author={self.author.id}'), None, False
+            ),
+            'recipes_list_favorited': (
+                get('/api/recipes/?is_favorited=1'), None, False
+            ),
+            'recipes_list_in_cart': (
+                get('/api/recipes/?is_in_shopping_cart=1'), None, False
+            ),
+            'recipes_feed': (get('/api/recipes/feed/'), None, False),
+            'recipes_feed_page': (get(self.feed_page), None, False),
+            'recipe_detail': (get(f'/api/recipes/{recipe}/'), None, False),
+            'recipe_create': (
+                lambda: client.post(
+                    '/api/recipes/', self.recipe_data(), format='json'
+                ),
+                None,
+                True
+            ),
+            'recipe_update': (
+                lambda recipe_id: client.patch(
+                    f'/api/recipes/{recipe_id}/',
+                    self.recipe_data(),
+                    format='json'
+                ),
+                own_recipe,
+                True
+            ),
+            'favorite_add': (
+                lambda: client.post(f'/api/recipes/{free}/favorite/'),
+                None,
+                True
+            ),
+            'favorite_remove': (
+                lambda _: client.delete(f'/api/recipes/{free}/favorite/'),
+                add(Favorites, free),
+                True
+            ),
+            'shopping_cart_add': (
+                lambda: client.post(f'/api/recipes/{free}/shopping_cart/'),
+                None,
+                True
+            ),
+            'shopping_cart_remove': (
+                lambda _: client.delete(f'/api/recipes/{free}/shopping_cart/'),
+                add(Basket, free),
+                True
+            ),
+            'download_shopping_cart_txt': (
+                get('/api/recipes/download_shopping_cart/'), None, False
+            ),
+            'download_shopping_cart_csv': (
+                get('/api/recipes/download_shopping_cart/?type=csv'),
+                None,
+                False
+            ),
+            'download_shopping_cart_pdf': (
+                get('/api/recipes/download_shopping_cart/?type=pdf'),
+                None,
+                False
+            ),
+            'ingredients_search': (
+                get('/api/ingredients/?name=са'), None, False
+            ),
+            'subscriptions': (
+                get('/api/users/subscriptions/?recipes_limit=3'), None, False
+            ),
+            'subscribe': (
+                lambda: client.post(f'/api/users/{self.author.id}/subscribe/'),
+                None,
+                True
+            ),
+            'unsubscribe': (
+                lambda: client.delete(
+                    f'/api/users/{self.followed.id}/subscribe/'
+                ),
+                None,
+                True
+            ),
+        }
+
+    def call(self, request, *args):
+        with CaptureQueriesContext(connection) as queries:
+            started = perf_counter()
+            response = request(*args)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = perf_counter() - started
+        return response, elapsed, len(queries)
+
+    def run(self, request, setup, write, cold):
+        if cold:
+            cache.clear()
+        if not write:
+            return self.call(request)
+        with transaction.atomic():
+            args = () if setup is None else (setup(),)
+            result = self.call(request, *args)
+            transaction.set_rollback(True)
+        return result
+
+    def measure(self, name, scenario, options):
+        request, setup, write = scenario
+        for _ in range(options['warmup']):
+            self.run(request, setup, write, options['cold'])
+        timings = []
+        for _ in range(options['iterations']):
+            response, elapsed, queries = self.run(
+                request, setup, write, options['cold']
+            )
+            if response.status_code >= 400:
+                raise CommandError(
+                    f'{name}: ответ {response.status_code} '
+                    f'{getattr(response, "content", b"")[:200]!r}'
+                )
+            timings.append(elapsed * 1000)
+        return {
+            'status': response.status_code,
+            'queries': queries,
+            'median_ms': round(median(timings), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'min_ms': round(min(timings), 3),
+        }
+
+    def compare(self, report, options):
+        try:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)['results']
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f'Не удалось прочитать отчёт: {error}')
+        regressions = []
+        for name, result in report['results'].items():
+            before = baseline.get(name)
+            if before is None:
+                self.stdout.write(f'{name:32} нет в базовом отчёте')
+                continue
+            change = result['median_ms'] / before['median_ms'] - 1
+            slower = change > options['threshold']
+            more_queries = result['queries'] > before['queries']
+            line = (
+                f'{name:32} {before["median_ms"]:9.2f} -> '
+                f'{result["median_ms"]:9.2f} ms ({change:+.0%}), '
+                f'запросов {before["queries"]} -> {result["queries"]}'
+            )
+            if slower or more_queries:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+        return regressions
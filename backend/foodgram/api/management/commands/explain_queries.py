@@ -0,0 +1,102 @@
+import re
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from foodgram.profiling import get_fingerprint
+
+from .benchmark_api import Command as BenchmarkCommand
+
+SEQ_SCAN = re.compile(r'Seq Scan on (\w+)|^SCAN (\w+)(?!.*USING)')
+EXECUTION_TIME = re.compile(r'Execution Time: ([\d.]+) ms')
+BUFFERS = re.compile(r'Buffers: shared((?: \w+=\d+)+)')
+
+
+def summarize(plan):
+    time, buffers, seq_scans = None, None, set()
+    for line in plan:
+        match = SEQ_SCAN.search(line.strip())
+        if match:
+            seq_scans.add(match.group(1) or match.group(2))
+        match = EXECUTION_TIME.search(line)
+        if match:
+            time = match.group(1)
+        match = BUFFERS.search(line)
+        if match and buffers is None:
+            buffers = match.group(1).strip()
+    return time, buffers, sorted(seq_scans)
+
+
+class Command(BenchmarkCommand):
+    help = ('Планы выполнения (EXPLAIN ANALYZE, BUFFERS) для запросов к БД, '
+            'которые выполняют эндпоинты API')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only',
+            nargs='*',
+            help='Показать только перечисленные сценарии benchmark_api'
+        )
+        parser.add_argument(
+            '--plans',
+            action='store_true',
+            help='Печатать планы целиком, а не только сводку'
+        )
+
+    def handle(self, *args, **options):
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']
+        ):
+            self.prepare()
+            scenarios = self.get_scenarios()
+            unknown = set(options['only'] or ()) - set(scenarios)
+            if unknown:
+                raise CommandError(
+                    'Неизвестные сценарии: ' + ', '.join(sorted(unknown))
+                )
+            seen = set()
+            for name, scenario in scenarios.items():
+                if options['only'] and name not in options['only']:
+                    continue
+                self.stdout.write(self.style.MIGRATE_HEADING(name))
+                self.explain_scenario(scenario, seen, options['plans'])
+
+    def explain_scenario(self, scenario, seen, plans):
+        request, setup, _ = scenario
+        with transaction.atomic():
+            args = () if setup is None else (setup(),)
+            with CaptureQueriesContext(connection) as queries:
+                response = request(*args)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            for query in queries.captured_queries:
+                sql = query['sql']
+                fingerprint = get_fingerprint(sql)
+                if not sql.startswith('SELECT') or fingerprint in seen:
+                    continue
+                seen.add(fingerprint)
+                self.write_plan(sql, self.explain(sql), plans)
+            transaction.set_rollback(True)
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('EXPLAIN (ANALYZE, BUFFERS) ' + sql)
+                return [row[0] for row in cursor.fetchall()]
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def write_plan(self, sql, plan, plans):
+        time, buffers, seq_scans = summarize(plan)
+        line = f'  {sql[:100]}'
+        if time is not None:
+            line += f'\n    {time} ms, buffers {buffers}'
+        self.stdout.write(line)
+        if seq_scans:
+            self.stdout.write(self.style.WARNING(
+                '    Seq Scan: ' + ', '.join(seq_scans)
+            ))
+        if plans:
+            for row in plan:
+                self.stdout.write(f'    {row}')
@@ -0,0 +1,185 @@
+import json
+import random
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from time import monotonic, perf_counter
+from urllib.parse import urlsplit
+
+import requests
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.utils import timezone
+from recipes.models import Ingredient, Recipe
+from rest_framework.authtoken.models import Token
+
+from .benchmark_api import get_commit, percentile
+
+User = get_user_model()
+
+
+def format_ms(value):
+    return f'{"—":>11}' if value is None else f'{value:8.1f} ms'
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест запущенного сервера: пропускная способность '
+            'и задержки эндпоинтов чтения при параллельных клиентах')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            nargs='+',
+            default=[1, 8, 32],
+            help='Число параллельных клиентов, по прогону на значение'
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=10,
+            help='Длительность прогона, с'
+        )
+        parser.add_argument(
+            '--slow-clients',
+            type=int,
+            default=0,
+            help='Клиенты, которые передают заголовки по байту в секунду'
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--output',
+            help='Сохранить отчёт в JSON-файл'
+        )
+
+    def handle(self, *args, **options):
+        if min(options['concurrency']) < 1 or options['duration'] <= 0:
+            raise CommandError(
+                'Число клиентов и длительность должны быть больше нуля'
+            )
+        self.prepare()
+        report = {
+            'commit': get_commit(),
+            'created': timezone.now().isoformat(),
+            'url': options['url'],
+            'duration': options['duration'],
+            'slow_clients': options['slow_clients'],
+            'results': {},
+        }
+        for concurrency in options['concurrency']:
+            result = self.load(concurrency, options)
+            report['results'][concurrency] = result
+            self.stdout.write(
+                f'{concurrency:4} клиентов {result["rps"]:8.1f} запр/с '
+                f'p50 {format_ms(result["p50_ms"])} '
+                f'p99 {format_ms(result["p99_ms"])} '
+                f'ошибок {result["errors"]}'
+            )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+
+    def prepare(self):
+        user = User.objects.annotate(
+            cart=Count('baskets')
+        ).filter(cart__gt=0).order_by('-cart', 'id').first()
+        if user is None:
+            raise CommandError(
+                'Нужна база с корзинами: выполните generate_data'
+            )
+        self.token = Token.objects.get_or_create(user=user)[0].key
+        self.recipes = list(
+            Recipe.objects.order_by('?').values_list('id', flat=True)[:1000]
+        )
+        self.pages = max(1, Recipe.objects.count() // 6)
+        self.prefixes = sorted({
+            name[:3] for name in Ingredient.objects.order_by(
+                '?'
+            ).values_list('name', flat=True)[:100]
+        })
+
+    def get_request(self, rng):
+        """Смесь запросов к эндпоинтам чтения: путь и нужна ли
+        авторизация."""
+        return rng.choice((
+            ('/api/tags/', False),
+            (f'/api/ingredients/?name={rng.choice(self.prefixes)}', False),
+            (f'/api/recipes/?page={rng.randint(1, self.pages)}', False),
+            (f'/api/recipes/?page={rng.randint(1, 20)}', True),
+            (f'/api/recipes/{rng.choice(self.recipes)}/', False),
+            (f'/api/recipes/{rng.choice(self.recipes)}/', True),
+            ('/api/recipes/download_shopping_cart/', True),
+        ))
+
+    def client(self, number, url, deadline, seed):
+        rng = random.Random(seed * 1000 + number)
+        session = requests.Session()
+        headers = {'Authorization': f'Token {self.token}'}
+        timings, errors = [], 0
+        while monotonic() < deadline:
+            path, authorized = self.get_request(rng)
+            started = perf_counter()
+            try:
+                response = session.get(
+                    url + path,
+                    headers=headers if authorized else None,
+                    timeout=30
+                )
+                response.content
+            except requests.RequestException:
+                errors += 1
+                continue
+            timings.append(perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+        return timings, errors
+
+    def slow_client(self, url, stop):
+        """Держит соединение, передавая заголовки запроса по байту."""
+        parts = urlsplit(url)
+        request = (
+            f'GET /api/tags/ HTTP/1.1\r\nHost: {parts.hostname}\r\n'
+            + 'X-Slow: ' + '.' * 600
+        ).encode()
+        try:
+            with socket.create_connection(
+                (parts.hostname, parts.port or 80), timeout=5
+            ) as connection:
+                for byte in request:
+                    connection.sendall(bytes((byte,)))
+                    if stop.wait(1):
+                        return
+        except OSError:
+            return
+
+    def load(self, concurrency, options):
+        slow = options['slow_clients']
+        stop = Event()
+        with ThreadPoolExecutor(max_workers=concurrency + slow) as executor:
+            for _ in range(slow):
+                executor.submit(self.slow_client, options['url'], stop)
+            started = monotonic()
+            deadline = started + options['duration']
+            futures = [
+                executor.submit(
+                    self.client,
+                    number,
+                    options['url'],
+                    deadline,
+                    options['seed']
+                )
+                for number in range(concurrency)
+            ]
+            results = [future.result() for future in futures]
+            elapsed = monotonic() - started
+            stop.set()
+        timings = [timing for result in results for timing in result[0]]
+        return {
+            'requests': len(timings),
+            'errors': sum(result[1] for result in results),
+            'rps': len(timings) / elapsed,
+            'p50_ms': percentile(timings, 0.5) * 1000 if timings else None,
+            'p99_ms': percentile(timings, 0.99) * 1000 if timings else None,
+        }
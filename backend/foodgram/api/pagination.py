@@ -1,6 +1,57 @@
-from rest_framework.pagination import PageNumberPagination
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (Cursor, CursorPagination,
+                                       PageNumberPagination)
+
+
+class CountPaginator(Paginator):
+    """Аннотации вроде is_favorited нужны только строкам страницы:
+    values('pk') убирает их из запроса COUNT(*)."""
+
+    @cached_property
+    def count(self):
+        if hasattr(self.object_list, 'values'):
+            return self.object_list.values('pk').count()
+        return super().count
 
 
 class CustomPagination(PageNumberPagination):
+    django_paginator_class = CountPaginator
+    page_size_query_param = 'limit'
+    page_size = 6
+
+
+class RecipeCursorPagination(CursorPagination):
     page_size_query_param = 'limit'
     page_size = 6
+    ordering = '-id'
+
+
+class FeedPagination(RecipeCursorPagination):
+    """Лента собирается из нескольких источников, поэтому курсор —
+    это id последнего рецепта страницы, а листать можно только вперёд."""
+
+    def paginate_feed(self, request, get_page):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        try:
+            before = None if cursor is None else int(cursor.position)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        page = get_page(before, self.page_size + 1)
+        self.has_next = len(page) > self.page_size
+        self.page = page[:self.page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=self.page[-1])
+        )
+
+    def get_previous_link(self):
+        return None
@@ -1,14 +1,25 @@
-from base64 import b64decode
+from hashlib import md5
+from json import dumps
 
-from django.core.files.base import ContentFile
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import Manager
+from django.http import Http404
+from django.utils import timezone
+from foodgram.profiling import ProfiledDataMixin, ProfiledListSerializer
+from recipes import cart
+from recipes.cache import TAGS_VERSION, SharedCache
+from recipes.images import get_rendition_name, read_base64_image
 from recipes.models import (Basket, Favorites, Ingredient, IngredientRecipe,
-                            Recipe, Tag)
-from rest_framework.serializers import (CharField, ImageField, ModelSerializer,
+                            Recipe, ShoppingCartItem, Tag)
+from rest_framework.serializers import (CharField, ImageField, IntegerField,
+                                        ListSerializer, ModelSerializer,
                                         SerializerMethodField, ValidationError)
 from rest_framework.status import HTTP_400_BAD_REQUEST
+from users.models import Follow
 from users.serializers import CustomUserSerializer
 
+from .fragments import get_fragments
+
 
 class IngredientSerializer(ModelSerializer):
     class Meta:
@@ -22,6 +33,20 @@ class TagSerializer(ModelSerializer):
         fields = '__all__'
 
 
+def build_tag_catalogue():
+    tags = [dict(tag) for tag in TagSerializer(Tag.objects.all(), many=True).data]
+    return {
+        'tags': tags,
+        'by_id': {tag['id']: tag for tag in tags},
+        'slugs': {tag['slug']: tag['id'] for tag in tags},
+        'etag': md5(dumps(tags).encode()).hexdigest(),
+        'modified': timezone.now(),
+    }
+
+
+tag_catalogue = SharedCache(TAGS_VERSION, build_tag_catalogue)
+
+
 class IngredientRecipeSerializer(ModelSerializer):
     id = CharField(source='ingredient.id')
     name = CharField(source='ingredient.name')
@@ -32,33 +57,77 @@ class IngredientRecipeSerializer(ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
+class ShoppingCartItemSerializer(ModelSerializer):
+    id = IntegerField(source='ingredient.id')
+    name = CharField(source='ingredient.name')
+    measurement_unit = CharField(source='ingredient.measurement_unit')
+
+    class Meta:
+        model = ShoppingCartItem
+        fields = ('id', 'name', 'measurement_unit', 'amount')
+
+
 class Base64ImageField(ImageField):
+    def __init__(self, rendition=None, detail_rendition=None, **kwargs):
+        self.rendition = rendition
+        self.detail_rendition = detail_rendition or rendition
+        super().__init__(**kwargs)
+
+    def get_rendition(self):
+        view = self.context.get('view')
+        if view is not None and getattr(view, 'action', None) == 'retrieve':
+            return self.detail_rendition
+        return self.rendition
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(b64decode(imgstr), name='temp.' + ext)
+            data = read_base64_image(data.partition(';base64,')[2])
         return super().to_internal_value(data)
 
+    def to_representation(self, value):
+        rendition = self.get_rendition()
+        if (not value or not rendition
+                or value.instance.image_renditions != value.name):
+            return super().to_representation(value)
+        url = value.storage.url(get_rendition_name(value.name, rendition))
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
 
-class ShortRecipeSerializer(ModelSerializer):
-    image = Base64ImageField()
+class ShortRecipeSerializer(ProfiledDataMixin, ModelSerializer):
+    image = Base64ImageField(rendition='thumbnail')
 
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
+        list_serializer_class = ProfiledListSerializer
 
 
-class RecipeSerializer(ModelSerializer):
-    tags = TagSerializer(many=True, read_only=True)
+class RecipeListSerializer(ProfiledDataMixin, ListSerializer):
+    def to_representation(self, data):
+        recipes = list(data.all() if isinstance(data, Manager) else data)
+        return [
+            self.child.add_user_fields(recipe, fragment)
+            for recipe, fragment in zip(
+                recipes,
+                get_fragments(self.child, recipes)
+            )
+        ]
+
+
+class RecipeSerializer(ProfiledDataMixin, ModelSerializer):
+    tags = SerializerMethodField()
     ingredients = IngredientRecipeSerializer(
         many=True,
-        read_only=True
+        read_only=True,
+        source='recipe_ingredients'
     )
     author = CustomUserSerializer(read_only=True)
     is_favorited = SerializerMethodField()
     is_in_shopping_cart = SerializerMethodField()
-    image = Base64ImageField()
+    image = Base64ImageField(rendition='card', detail_rendition='full')
 
     class Meta:
         model = Recipe
@@ -74,16 +143,39 @@ class RecipeSerializer(ModelSerializer):
             'is_favorited',
             'is_in_shopping_cart'
         )
+        list_serializer_class = RecipeListSerializer
+
+    def to_representation(self, instance):
+        return self.add_user_fields(
+            instance,
+            get_fragments(self, [instance])[0]
+        )
+
+    def build_fragment(self, instance):
+        return super().to_representation(instance)
+
+    def add_user_fields(self, instance, fragment):
+        data = dict(fragment)
+        data['author'] = dict(
+            fragment['author'],
+            is_subscribed=self.get_is_subscribed(instance)
+        )
+        data['is_favorited'] = self.get_is_favorited(instance)
+        data['is_in_shopping_cart'] = self.get_is_in_shopping_cart(instance)
+        return data
 
     def add_ingredients(self, instance, ingredients):
-        for ingredient in ingredients:
-            ing, _ = IngredientRecipe.objects.get_or_create(
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(
+                recipe=instance,
                 ingredient_id=ingredient['id'],
                 amount=ingredient['amount']
             )
-            instance.ingredients.add(ing)
+            for ingredient in ingredients
+        )
         return instance
 
+    @transaction.atomic
     def create(self, validated_data):
         tags = self.validate_tags(self.initial_data.get('tags'))
         ingredients = self.validate_ingredients(
@@ -93,23 +185,46 @@ class RecipeSerializer(ModelSerializer):
         recipe.tags.set(tags)
         return self.add_ingredients(recipe, ingredients)
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        super().update(instance, validated_data)
         tags = self.validate_tags(self.initial_data.get('tags'))
         ingredients = self.validate_ingredients(
             self.initial_data.get('ingredients')
         )
-        instance.tags.clear()
+        cart.lock_recipe(instance.id)
+        super().update(instance, validated_data)
         instance.tags.set(tags)
+        cart.subtract_recipe_ingredients(instance.id)
         instance.ingredients.clear()
-        instance = self.add_ingredients(instance, ingredients)
-        instance.save()
+        self.add_ingredients(instance, ingredients)
+        cart.add_recipe_ingredients(instance.id)
         return instance
 
+    def get_tags(self, obj):
+        if not hasattr(self, '_tags'):
+            self._tags = tag_catalogue.get()['by_id']
+        return [
+            self._tags.get(tag.id) or TagSerializer(tag).data
+            for tag in obj.tags.all()
+        ]
+
+    def get_is_subscribed(self, obj):
+        request = self.context.get('request')
+        if request.user.is_anonymous:
+            return False
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        return Follow.objects.filter(
+            user=request.user,
+            author_id=obj.author_id
+        ).exists()
+
     def get_is_favorited(self, obj):
         request = self.context.get('request')
         if request.user.is_anonymous:
             return False
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         return Favorites.objects.filter(
             user=request.user,
             recipe=obj
@@ -119,30 +234,24 @@ class RecipeSerializer(ModelSerializer):
         request = self.context.get('request')
         if request.user.is_anonymous:
             return False
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         return Basket.objects.filter(
             user=request.user,
             recipe=obj
         ).exists()
 
     def validate_ingredients(self, value):
-        if len(value) == 0:
+        if not value:
             raise ValidationError(
                 {'ingredients': ('В рецепте должен быть использован'
                                  ' минимум один ингредиент')},
                 code=HTTP_400_BAD_REQUEST
             )
-        ingredient_list = []
+        ingredients = {}
         for ingredient in value:
-            current_ingredient = get_object_or_404(
-                Ingredient,
-                pk=ingredient.get('id')
-            )
-            if current_ingredient in ingredient_list:
-                raise ValidationError(
-                    {'ingredients': ('Ингредиенты не должны'
-                                     ' повторяться в рецепте')},
-                    code=HTTP_400_BAD_REQUEST
-                )
+            if not str(ingredient.get('id')).isdigit():
+                raise Http404
             amount = ingredient.get('amount')
             if not str(amount).isdigit() or int(amount) < 1:
                 raise ValidationError(
@@ -150,8 +259,21 @@ class RecipeSerializer(ModelSerializer):
                                 ' должно быть числом больше или равно 1')},
                     code=HTTP_400_BAD_REQUEST
                 )
-            ingredient_list.append(current_ingredient)
-        return value
+            ingredients[int(ingredient['id'])] = int(amount)
+        if len(ingredients) != len(value):
+            raise ValidationError(
+                {'ingredients': ('Ингредиенты не должны'
+                                 ' повторяться в рецепте')},
+                code=HTTP_400_BAD_REQUEST
+            )
+        if Ingredient.objects.filter(
+            id__in=ingredients
+        ).count() != len(ingredients):
+            raise Http404
+        return [
+            {'id': ingredient_id, 'amount': amount}
+            for ingredient_id, amount in ingredients.items()
+        ]
 
     def validate_tags(self, value):
         tags_set = set(value)
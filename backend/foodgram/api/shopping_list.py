@@ -0,0 +1,85 @@
+import csv
+from io import BytesIO
+
+from django.conf import settings
+from recipes.models import ShoppingCartItem
+from recipes.units import format_amount, humanize
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen.canvas import Canvas
+
+PDF_FONT = 'ShoppingListFont'
+CSV_HEADER = ('Ингредиент', 'Единица измерения', 'Количество')
+
+
+def get_shopping_list(user):
+    return [
+        (name, *humanize(measurement_unit, amount))
+        for name, measurement_unit, amount in ShoppingCartItem.objects.filter(
+            user=user
+        ).order_by('ingredient__name').values_list(
+            'ingredient__name',
+            'ingredient__measurement_unit',
+            'amount'
+        )
+    ]
+
+
+def format_line(name, measurement_unit, amount, separator):
+    if amount is None:
+        return f'{name} ({measurement_unit})'
+    return f'{name} ({measurement_unit}) {separator} {format_amount(amount)}'
+
+
+def render_text(ingredients):
+    for ingredient in ingredients:
+        yield f'* {format_line(*ingredient, "--")}\n\n'
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def render_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield '\ufeff' + writer.writerow(CSV_HEADER)
+    for name, measurement_unit, amount in ingredients:
+        yield writer.writerow((
+            name,
+            measurement_unit,
+            '' if amount is None else format_amount(amount)
+        ))
+
+
+def render_pdf(ingredients):
+    if PDF_FONT not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(
+            TTFont(PDF_FONT, settings.SHOPPING_LIST_PDF_FONT)
+        )
+    buffer = BytesIO()
+    canvas = Canvas(buffer, pagesize=A4)
+    width, height = A4
+    y = height - 20 * mm
+    canvas.setFont(PDF_FONT, 16)
+    canvas.drawString(20 * mm, y, 'Список покупок')
+    y -= 12 * mm
+    canvas.setFont(PDF_FONT, 12)
+    for ingredient in ingredients:
+        if y < 20 * mm:
+            canvas.showPage()
+            canvas.setFont(PDF_FONT, 12)
+            y = height - 20 * mm
+        canvas.drawString(20 * mm, y, f'• {format_line(*ingredient, "—")}')
+        y -= 8 * mm
+    canvas.save()
+    yield buffer.getvalue()
+
+
+RENDERERS = {
+    'txt': (render_text, 'text/plain;charset=UTF-8'),
+    'csv': (render_csv, 'text/csv;charset=UTF-8'),
+    'pdf': (render_pdf, 'application/pdf'),
+}
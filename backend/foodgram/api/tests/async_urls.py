@@ -0,0 +1,8 @@
+from django.urls import include, path
+
+from api.urls import async_urls, router
+
+urlpatterns = [
+    path('api/', include(async_urls(router.urls))),
+    path('api/', include('users.urls'))
+]
@@ -0,0 +1,111 @@
+import asyncio
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import (AsyncClient, SimpleTestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import resolve, reverse
+from foodgram.middleware import QueryObserverMiddleware
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+from rest_framework.authtoken.models import Token
+
+from api.urls import ASYNC_VIEWS
+
+User = get_user_model()
+
+ASYNC_URLCONF = 'api.tests.async_urls'
+
+
+def get_query_count(response):
+    return int(re.search(
+        r'desc="(\d+) queries"', response['Server-Timing']
+    ).group(1))
+
+
+@override_settings(SQL_PROFILING=True)
+class AsyncViewsTest(TransactionTestCase):
+    """Представления из ASYNC_VIEWS под ASGI выполняются в пуле потоков
+    и отвечают так же, как синхронные, а middleware видит их запросы
+    к БД."""
+
+    def setUp(self):
+        user = User.objects.create_user(
+            email='cook@example.com', username='cook', password='pass'
+        )
+        self.token = f'Token {Token.objects.create(user=user).key}'
+        tag = Tag.objects.create(name='Завтрак', color='#000000',
+                                 slug='breakfast')
+        ingredient = Ingredient.objects.create(name='мука',
+                                               measurement_unit='г')
+        recipe = Recipe.objects.create(
+            name='Блины', text='Описание', cooking_time=10, author=user
+        )
+        recipe.tags.add(tag)
+        IngredientRecipe.objects.create(
+            recipe=recipe, ingredient=ingredient, amount=1500
+        )
+        self.client.post(
+            f'/api/recipes/{recipe.id}/shopping_cart/',
+            HTTP_AUTHORIZATION=self.token
+        )
+        pks = {'tag': tag.id, 'ingredient': ingredient.id,
+               'recipe': recipe.id}
+        self.urls = {
+            name: reverse(name, urlconf=ASYNC_URLCONF, kwargs={
+                'pk': pks[name.split('-')[0]]
+            } if name.endswith('-detail') else None)
+            for name in ASYNC_VIEWS
+        }
+        self.expected = {}
+        for name, url in self.urls.items():
+            cache.clear()
+            response = self.client.get(url, HTTP_AUTHORIZATION=self.token)
+            self.assertEqual(response.status_code, 200)
+            content = (
+                b''.join(response.streaming_content) if response.streaming
+                else response.content
+            )
+            self.expected[name] = content, get_query_count(response)
+
+    @override_settings(ASYNC_API_VIEWS=True, ROOT_URLCONF=ASYNC_URLCONF)
+    async def test_async_views(self):
+        client = AsyncClient()
+        for name, url in self.urls.items():
+            with self.subTest(name):
+                self.assertTrue(asyncio.iscoroutinefunction(
+                    resolve(url).func
+                ))
+                cache.clear()
+                response = await client.get(url, authorization=self.token)
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(response.streaming)
+                content, queries = self.expected[name]
+                self.assertEqual(response.content, content)
+                self.assertGreater(queries, 0)
+                self.assertEqual(get_query_count(response), queries)
+
+    @override_settings(ASYNC_API_VIEWS=True, ROOT_URLCONF=ASYNC_URLCONF)
+    async def test_download_shopping_cart(self):
+        response = await AsyncClient().get(
+            self.urls['recipe-download-shopping-cart'] + '?type=csv',
+            authorization=self.token
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.streaming)
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename="shopping_list.csv"'
+        )
+        self.assertIn('мука,кг,"1,5"', response.content.decode())
+
+
+class QueryObserverMiddlewareTest(SimpleTestCase):
+
+    def test_requires_observer(self):
+        class IncompleteMiddleware(QueryObserverMiddleware):
+            def get_observer(self):
+                return None
+
+        with self.assertRaises(TypeError):
+            IncompleteMiddleware(lambda request: None)
@@ -0,0 +1,183 @@
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from threading import Event
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from recipes import cart
+from recipes.models import Ingredient, Recipe, ShoppingCartItem, Tag
+from rest_framework.test import APIClient
+
+User = get_user_model()
+
+
+@skipUnless(
+    connection.vendor == 'postgresql',
+    'SQLite в памяти блокирует таблицы при параллельной записи'
+)
+class CartDuringRecipeEditTest(TransactionTestCase):
+    """Добавление рецепта в корзину во время правки его состава ждёт
+    конца правки, и итоги корзины совпадают с новым составом."""
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            email='author@example.com', username='author', password='pass'
+        )
+        self.reader = User.objects.create_user(
+            email='reader@example.com', username='reader', password='pass'
+        )
+        self.tag = Tag.objects.create(
+            name='Завтрак', color='#000000', slug='breakfast'
+        )
+        self.flour, self.milk = (
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('мука', 'молоко')
+        )
+        self.recipe = Recipe.objects.create(
+            name='Блины', text='Описание', cooking_time=10,
+            author=self.author
+        )
+        self.recipe.tags.add(self.tag)
+        self.recipe.recipe_ingredients.create(
+            ingredient=self.flour, amount=200
+        )
+        self.subtracted = Event()
+        self.added = Event()
+
+    def get_client(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def edit(self):
+        subtract = cart.subtract_recipe_ingredients
+
+        def subtract_and_wait(recipe_id):
+            subtract(recipe_id)
+            self.subtracted.set()
+            # Без блокировки рецепта добавление в корзину успевает
+            # завершиться здесь, между вычитанием и прибавлением.
+            self.added.wait(1)
+
+        try:
+            with mock.patch.object(
+                cart, 'subtract_recipe_ingredients', subtract_and_wait
+            ):
+                return self.get_client(self.author).patch(
+                    f'/api/recipes/{self.recipe.id}/',
+                    {
+                        'name': 'Блины',
+                        'text': 'Описание',
+                        'cooking_time': 10,
+                        'tags': [self.tag.id],
+                        'ingredients': [
+                            {'id': self.milk.id, 'amount': 500}
+                        ],
+                    },
+                    format='json'
+                ).status_code
+        finally:
+            connection.close()
+
+    def add_to_cart(self):
+        try:
+            self.subtracted.wait(5)
+            return self.get_client(self.reader).post(
+                f'/api/recipes/{self.recipe.id}/shopping_cart/'
+            ).status_code
+        finally:
+            self.added.set()
+            connection.close()
+
+    def test_add_during_edit(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            edited = executor.submit(self.edit)
+            added = executor.submit(self.add_to_cart)
+            self.assertEqual((edited.result(), added.result()), (200, 201))
+        self.assertEqual(cart.check_totals(), [])
+        self.assertEqual(
+            list(self.reader.shopping_cart_items.values_list(
+                'ingredient', 'amount'
+            )),
+            [(self.milk.id, 500)]
+        )
+
+
+class RecipeDeleteTest(TestCase):
+    """Удаление рецепта вычитает его из всех корзин одним запросом,
+    число запросов не зависит от числа корзин."""
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            email='author@example.com', username='author', password='pass'
+        )
+        self.flour = Ingredient.objects.create(
+            name='мука', measurement_unit='г'
+        )
+        self.bread = self.create_recipe('Хлеб', 300)
+
+    def create_recipe(self, name, amount):
+        recipe = Recipe.objects.create(
+            name=name, text='Описание', cooking_time=10, author=self.author
+        )
+        recipe.recipe_ingredients.create(ingredient=self.flour, amount=amount)
+        return recipe
+
+    def delete_in_carts(self, carts):
+        recipe = self.create_recipe('Блины', 200)
+        for number in range(carts):
+            reader = User.objects.create_user(
+                email=f'reader{carts}-{number}@example.com',
+                username=f'reader{carts}-{number}',
+                password='pass'
+            )
+            client = APIClient()
+            client.force_authenticate(reader)
+            for cart_recipe in (recipe, self.bread):
+                self.assertEqual(client.post(
+                    f'/api/recipes/{cart_recipe.id}/shopping_cart/'
+                ).status_code, 201)
+        client = APIClient()
+        client.force_authenticate(self.author)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.delete(f'/api/recipes/{recipe.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(cart.check_totals(), [])
+        return len(queries)
+
+    def test_delete_recipe_in_carts(self):
+        self.assertEqual(self.delete_in_carts(2), self.delete_in_carts(8))
+
+
+class CheckTotalsCommandTest(TestCase):
+
+    def test_check_selected_users(self):
+        author, broken, correct = (
+            User.objects.create_user(
+                email=f'{name}@example.com', username=name, password='pass'
+            )
+            for name in ('author', 'broken', 'correct')
+        )
+        recipe = Recipe.objects.create(
+            name='Блины', text='Описание', cooking_time=10, author=author
+        )
+        recipe.recipe_ingredients.create(
+            ingredient=Ingredient.objects.create(
+                name='мука', measurement_unit='г'
+            ),
+            amount=200
+        )
+        for user in (broken, correct):
+            client = APIClient()
+            client.force_authenticate(user)
+            client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+        ShoppingCartItem.objects.filter(user=broken).update(amount=1)
+        call_command('rebuild_shopping_carts', '--check',
+                     '--user', str(correct.id), stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('rebuild_shopping_carts', '--check',
+                         '--user', str(broken.id), stdout=StringIO())
@@ -0,0 +1,101 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from recipes.feed import unfollow
+from recipes.models import FeedItem, Recipe
+from rest_framework.test import APIClient
+from users.models import Follow
+
+User = get_user_model()
+
+
+@override_settings(
+    FEED_FAN_OUT_MAX_FOLLOWERS=2, FEED_FAN_OUT_RESUME_FOLLOWERS=1
+)
+class FeedFanOutTest(TestCase):
+    """Раскладка рецептов по лентам выключается, когда подписчиков больше
+    порога, и возобновляется один раз, когда их становится меньше."""
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            email='author@example.com', username='author', password='pass'
+        )
+        self.readers = [
+            User.objects.create_user(
+                email=f'reader{number}@example.com',
+                username=f'reader{number}',
+                password='pass'
+            )
+            for number in range(3)
+        ]
+        self.recipes = [self.publish() for _ in range(2)]
+
+    def publish(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Recipe.objects.create(
+                name='Рецепт', text='Описание', cooking_time=10,
+                author=self.author
+            )
+
+    def request(self, method, reader):
+        client = APIClient()
+        client.force_authenticate(reader)
+        return getattr(client, method)(
+            f'/api/users/{self.author.id}/subscribe/'
+        )
+
+    def feed(self, reader):
+        return set(FeedItem.objects.filter(user=reader).values_list(
+            'recipe_id', flat=True
+        ))
+
+    def test_fan_out_switches_once(self):
+        for reader in self.readers:
+            self.assertEqual(self.request('post', reader).status_code, 201)
+        self.author.refresh_from_db()
+        self.assertFalse(self.author.feed_fan_out)
+        hidden = self.publish()
+        self.assertFalse(FeedItem.objects.filter(recipe=hidden).exists())
+
+        self.assertEqual(self.request('delete', self.readers[0]).status_code,
+                         204)
+        self.author.refresh_from_db()
+        self.assertFalse(self.author.feed_fan_out)
+        self.assertFalse(FeedItem.objects.filter(recipe=hidden).exists())
+
+        self.assertEqual(self.request('delete', self.readers[1]).status_code,
+                         204)
+        self.author.refresh_from_db()
+        self.assertTrue(self.author.feed_fan_out)
+        self.assertEqual(
+            self.feed(self.readers[2]),
+            {recipe.id for recipe in (*self.recipes, hidden)}
+        )
+
+        FeedItem.objects.filter(recipe=hidden).delete()
+        self.assertEqual(self.request('post', self.readers[0]).status_code,
+                         201)
+        self.assertEqual(self.request('delete', self.readers[0]).status_code,
+                         204)
+        self.assertFalse(FeedItem.objects.filter(recipe=hidden).exists())
+
+    def test_unsubscribe_rolls_back(self):
+        def broken_unfollow(*args):
+            unfollow(*args)
+            raise RuntimeError
+
+        self.assertEqual(self.request('post', self.readers[0]).status_code,
+                         201)
+        with mock.patch('users.views.unfollow', broken_unfollow):
+            with self.assertRaises(RuntimeError):
+                self.request('delete', self.readers[0])
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 1)
+        self.assertTrue(Follow.objects.filter(
+            user=self.readers[0], author=self.author
+        ).exists())
+        self.assertEqual(
+            self.feed(self.readers[0]),
+            {recipe.id for recipe in self.recipes}
+        )
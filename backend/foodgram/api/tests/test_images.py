@@ -0,0 +1,82 @@
+import os
+from io import BytesIO
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from recipes.images import process_recipe_image
+from recipes.models import Recipe
+from recipes.storage import image_storage
+from rest_framework.test import APIClient
+
+User = get_user_model()
+
+
+class RecipeImageRenditionsTest(TestCase):
+    """Уменьшенные копии отдаются, когда рецепт отмечен как готовый;
+    сериализатор при этом не обращается к хранилищу."""
+
+    def setUp(self):
+        media = TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.media = media.name
+        buffer = BytesIO()
+        Image.new('RGB', (900, 600), 'red').save(buffer, 'PNG')
+        name = image_storage.save(
+            'recipes/images/red.png', ContentFile(buffer.getvalue())
+        )
+        author = User.objects.create_user(
+            email='author@example.com', username='author', password='pass'
+        )
+        self.recipes = [
+            Recipe.objects.create(
+                name=f'Рецепт {number}',
+                text='Описание',
+                cooking_time=10,
+                author=author,
+                image=name
+            )
+            for number in range(5)
+        ]
+        self.client = APIClient()
+
+    def get_images(self):
+        with mock.patch.object(
+            image_storage, 'exists', side_effect=AssertionError
+        ):
+            response = self.client.get('/api/recipes/?limit=10')
+        self.assertEqual(response.status_code, 200)
+        return {recipe['image'] for recipe in response.json()['results']}
+
+    def test_renditions_ready(self):
+        self.assertEqual(
+            self.get_images(),
+            {'http://testserver/media/recipes/images/red.png'}
+        )
+        process_recipe_image(self.recipes[0].id, 'recipes/images/red.png')
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(
+                self.media, 'recipes/images/renditions/red'
+            ))),
+            ['card.webp', 'full.webp', 'thumbnail.webp']
+        )
+        self.assertEqual(
+            self.get_images(),
+            {
+                'http://testserver/media/recipes/images/red.png',
+                'http://testserver/media/recipes/images/renditions/red/'
+                'card.webp',
+            }
+        )
+        self.assertEqual(
+            Recipe.objects.filter(
+                image_renditions='recipes/images/red.png'
+            ).count(),
+            1
+        )
@@ -0,0 +1,66 @@
+import re
+from io import StringIO
+from tempfile import NamedTemporaryFile
+from unittest import mock, skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from recipes.management.commands.parse_ingredients_csv import Command
+from recipes.models import Ingredient
+
+CSV = (
+    'мука,г\n'
+    'соль,г\n'
+    ',г\n'
+    'мука,кг\n'
+    'сахар,г\n'
+    'соль,щепотка\n'
+    'молоко,мл\n'
+)
+
+
+class IngredientsImportTest(TestCase):
+    """Итоговая строка импорта считает действительно добавленные строки,
+    а повторы наименований пропускает одинаково в обоих способах."""
+
+    def setUp(self):
+        file = NamedTemporaryFile('w', suffix='.csv', encoding='utf-8')
+        self.addCleanup(file.close)
+        file.write(CSV)
+        file.flush()
+        self.path = file.name
+
+    def run_import(self, *args):
+        stdout = StringIO()
+        call_command('parse_ingredients_csv', '--path', self.path,
+                     *args, stdout=stdout)
+        return tuple(map(int, re.search(
+            r'добавлено (\d+), обновлено (\d+), без изменений (\d+), '
+            r'пропущено (\d+)',
+            stdout.getvalue()
+        ).groups()))
+
+    def test_duplicates_across_batches(self):
+        self.assertEqual(self.run_import('--batch-size', '2'), (4, 0, 0, 3))
+        self.assertEqual(
+            dict(Ingredient.objects.values_list('name', 'measurement_unit')),
+            {'мука': 'г', 'соль': 'г', 'сахар': 'г', 'молоко': 'мл'}
+        )
+
+    def test_concurrent_insert(self):
+        insert = Command.insert
+
+        def insert_after_other_load(command, rows):
+            Ingredient.objects.create(name='сахар', measurement_unit='г')
+            return insert(command, rows)
+
+        with mock.patch.object(Command, 'insert', insert_after_other_load):
+            self.assertEqual(self.run_import(), (3, 0, 1, 3))
+        self.assertEqual(Ingredient.objects.count(), 4)
+
+    @skipUnless(connection.vendor == 'postgresql', 'COPY есть в PostgreSQL')
+    def test_copy_counts_match(self):
+        copied = self.run_import('--copy')
+        Ingredient.objects.all().delete()
+        self.assertEqual(self.run_import('--batch-size', '2'), copied)
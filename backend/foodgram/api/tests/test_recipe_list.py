@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from recipes.models import (Basket, Favorites, Ingredient, IngredientRecipe,
+                            Recipe, Tag)
+from rest_framework.test import APIClient
+from users.models import Follow
+
+User = get_user_model()
+
+
+class RecipeListQueriesTest(TestCase):
+    """Число запросов к БД в списке рецептов не зависит от размера
+    страницы: теги, ингредиенты и авторы загружаются пачкой."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='reader@example.com', username='reader', password='pass'
+        )
+        authors = [
+            User.objects.create_user(
+                email=f'author{number}@example.com',
+                username=f'author{number}',
+                password='pass'
+            )
+            for number in range(10)
+        ]
+        tags = [
+            Tag.objects.create(
+                name=f'Тег {number}', color=f'#00000{number}', slug=f'tag{number}'
+            )
+            for number in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'ингредиент {number}', measurement_unit='г'
+            )
+            for number in range(20)
+        ]
+        recipes = [
+            Recipe.objects.create(
+                name=f'Рецепт {number}',
+                text='Описание',
+                cooking_time=10,
+                author=authors[number % len(authors)]
+            )
+            for number in range(110)
+        ]
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag=tag)
+            for number, recipe in enumerate(recipes)
+            for tag in tags[:number % 3 + 1]
+        )
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(
+                recipe=recipe,
+                ingredient=ingredients[(number + shift) % len(ingredients)],
+                amount=100
+            )
+            for number, recipe in enumerate(recipes)
+            for shift in range(3)
+        )
+        Favorites.objects.bulk_create(
+            Favorites(user=cls.user, recipe=recipe) for recipe in recipes[::3]
+        )
+        Basket.objects.bulk_create(
+            Basket(user=cls.user, recipe=recipe) for recipe in recipes[::4]
+        )
+        Follow.objects.bulk_create(
+            Follow(user=cls.user, author=author) for author in authors[::2]
+        )
+
+    def count_queries(self, client, limit):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(f'/api/recipes/?limit={limit}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), limit)
+        return len(queries)
+
+    def assert_constant_queries(self, client):
+        for fragment_cache in (True, False):
+            with self.subTest(fragment_cache=fragment_cache), override_settings(
+                RECIPE_FRAGMENT_CACHE=fragment_cache
+            ):
+                queries = self.count_queries(client, 6)
+                cache.clear()
+                with self.assertNumQueries(queries):
+                    response = client.get('/api/recipes/?limit=100')
+                self.assertEqual(len(response.json()['results']), 100)
+
+    def test_anonymous(self):
+        self.assert_constant_queries(APIClient())
+
+    def test_authenticated(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assert_constant_queries(client)
@@ -0,0 +1,102 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db.models import Sum
+from django.test import SimpleTestCase, TestCase
+from recipes.models import Ingredient, IngredientRecipe, Recipe
+from recipes.units import format_amount, humanize, to_base
+from rest_framework.test import APIClient
+
+User = get_user_model()
+
+UNITS = ('г', 'кг', 'мл', 'л', 'ч. л.', 'ст. л.', 'Ст.л.', 'шт.', 'по вкусу')
+
+
+class HumanizeTest(SimpleTestCase):
+
+    def test_larger_unit(self):
+        self.assertEqual(humanize('г', 1500), ('кг', Decimal('1.5')))
+        self.assertEqual(format_amount(humanize('г', 1500)[1]), '1,5')
+        self.assertEqual(humanize('ч. л.', 9), ('ст. л.', 3))
+
+    def test_inexact_amount_unchanged(self):
+        self.assertEqual(humanize('ч. л.', 7), ('ч. л.', 7))
+        self.assertEqual(humanize('г', 999), ('г', 999))
+
+    def test_without_amount(self):
+        self.assertEqual(humanize('по вкусу', 5), ('по вкусу', None))
+        self.assertEqual(humanize('По вкусу', 5), ('По вкусу', None))
+
+
+class ShoppingListTotalsTest(TestCase):
+    """Строки скачанного списка покупок, переведённые обратно в базовые
+    единицы, совпадают с суммой количеств по рецептам корзины."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='cook@example.com', username='cook', password='pass'
+        )
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'ингредиент {number}',
+                measurement_unit=UNITS[number % len(UNITS)]
+            )
+            for number in range(45)
+        ]
+        cls.recipes = [
+            Recipe.objects.create(
+                name=f'Рецепт {number}',
+                text='Описание',
+                cooking_time=10,
+                author=cls.user
+            )
+            for number in range(60)
+        ]
+        for number, recipe in enumerate(cls.recipes):
+            for shift in range(8):
+                IngredientRecipe.objects.create(
+                    recipe=recipe,
+                    ingredient=ingredients[
+                        (number * 7 + shift) % len(ingredients)
+                    ],
+                    amount=(number * 37 + shift * 250) % 1500 + 1
+                )
+
+    def parse(self, line):
+        name, rest = line[2:].split(' (', 1)
+        unit, _, amount = rest.partition(') -- ')
+        if not amount:
+            return name, unit.rstrip(')'), None
+        return name, unit, Decimal(amount.replace(',', '.'))
+
+    def test_download_matches_aggregation(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for recipe in self.recipes:
+            response = client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+            self.assertEqual(response.status_code, 201)
+        response = client.get('/api/recipes/download_shopping_cart/')
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode().split('\n\n')
+        downloaded = {}
+        for line in filter(None, lines):
+            name, unit, amount = self.parse(line)
+            downloaded[name] = (
+                (unit, None) if amount is None else to_base(unit, amount)
+            )
+        expected = {
+            row['ingredient__name']: (
+                (row['ingredient__measurement_unit'], None)
+                if row['ingredient__measurement_unit'] == 'по вкусу'
+                else to_base(row['ingredient__measurement_unit'],
+                             Decimal(row['total']))
+            )
+            for row in IngredientRecipe.objects.filter(
+                recipe__baskets__user=self.user
+            ).values(
+                'ingredient__name', 'ingredient__measurement_unit'
+            ).annotate(total=Sum('amount'))
+        }
+        self.assertEqual(len(expected), 45)
+        self.assertEqual(downloaded, expected)
@@ -0,0 +1,106 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TransactionTestCase
+from recipes.models import Basket, Favorites, Ingredient, Recipe
+from rest_framework.test import APIClient
+from users.models import Follow
+
+User = get_user_model()
+
+CLIENTS = 8
+
+
+@skipUnless(
+    connection.vendor == 'postgresql',
+    'SQLite в памяти блокирует таблицы при параллельной записи'
+)
+class ParallelTogglesTest(TransactionTestCase):
+    """Параллельные клики по избранному, корзине и подписке: ровно один
+    запрос меняет состояние, остальные получают 400, а не 500."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='reader@example.com', username='reader', password='pass'
+        )
+        self.author = User.objects.create_user(
+            email='author@example.com', username='author', password='pass'
+        )
+        self.recipe = Recipe.objects.create(
+            name='Рецепт',
+            text='Описание',
+            cooking_time=10,
+            author=self.author
+        )
+        self.recipe.recipe_ingredients.create(
+            ingredient=Ingredient.objects.create(
+                name='мука', measurement_unit='г'
+            ),
+            amount=200
+        )
+
+    def click(self, barrier, method, url):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        try:
+            barrier.wait()
+            return getattr(client, method)(url).status_code
+        finally:
+            connection.close()
+
+    def assert_one_succeeds(self, method, url, status):
+        barrier = Barrier(CLIENTS)
+        with ThreadPoolExecutor(max_workers=CLIENTS) as executor:
+            statuses = Counter(executor.map(
+                lambda _: self.click(barrier, method, url), range(CLIENTS)
+            ))
+        self.assertEqual(statuses, Counter({status: 1, 400: CLIENTS - 1}))
+
+    def assert_toggles(self, url):
+        for _ in range(3):
+            self.assert_one_succeeds('post', url, 201)
+            self.assert_one_succeeds('delete', url, 204)
+
+    def test_favorite(self):
+        self.assert_toggles(f'/api/recipes/{self.recipe.id}/favorite/')
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 0)
+        self.assertFalse(Favorites.objects.exists())
+
+    def test_shopping_cart(self):
+        self.assert_toggles(f'/api/recipes/{self.recipe.id}/shopping_cart/')
+        self.assertFalse(Basket.objects.exists())
+        self.assertFalse(self.user.shopping_cart_items.exists())
+
+    def test_subscribe(self):
+        self.assert_toggles(f'/api/users/{self.author.id}/subscribe/')
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 0)
+        self.assertFalse(Follow.objects.exists())
+
+
+class RelatedManagersTest(TransactionTestCase):
+    """Методы RelationManager не попадают в менеджеры связей."""
+
+    def test_related_managers(self):
+        user = User.objects.create_user(
+            email='reader@example.com', username='reader', password='pass'
+        )
+        author = User.objects.create_user(
+            email='author@example.com', username='author', password='pass'
+        )
+        recipe = Recipe.objects.create(
+            name='Рецепт', text='Описание', cooking_time=10, author=author
+        )
+        user.baskets.create(recipe=recipe)
+        recipe.favorites.create(user=user)
+        author.follower.create(user=user)
+        for manager in (user.baskets, recipe.favorites, author.follower):
+            self.assertEqual(manager.count(), 1)
+            self.assertFalse(hasattr(manager, 'remove'))
+        self.assertTrue(Basket.relations.remove(user.id, recipe.id))
+        self.assertFalse(Basket.relations.remove(user.id, recipe.id))
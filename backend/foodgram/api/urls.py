@@ -1,16 +1,44 @@
-from django.urls import include, path
+from django.conf import settings
+from django.urls import URLPattern, include, path
+from foodgram.asynchronous import async_view
 from rest_framework.routers import DefaultRouter
 
 from .views import IngredientViewSet, RecipeViewSet, TagViewSet
 
 app_name = 'api'
 
+ASYNC_VIEWS = (
+    'tag-list',
+    'tag-detail',
+    'ingredient-list',
+    'ingredient-detail',
+    'recipe-list',
+    'recipe-detail',
+    'recipe-download-shopping-cart',
+)
+
 router = DefaultRouter()
 
 router.register('tags', TagViewSet)
 router.register('ingredients', IngredientViewSet)
 router.register('recipes', RecipeViewSet)
 
+
+def async_urls(urls):
+    return [
+        URLPattern(
+            url.pattern,
+            async_view(url.callback),
+            url.default_args,
+            url.name
+        )
+        if url.name in ASYNC_VIEWS else url
+        for url in urls
+    ]
+
+
 urlpatterns = [
-    path('', include(router.urls))
+    path('', include(
+        async_urls(router.urls) if settings.ASYNC_API_VIEWS else router.urls
+    ))
 ]
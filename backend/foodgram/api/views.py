@@ -1,19 +1,34 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from django_filters.rest_framework import DjangoFilterBackend
-from recipes.models import (Basket, Favorites, Ingredient, IngredientRecipe,
-                            Recipe, Tag)
+from recipes import cart
+from recipes.counters import change_counter
+from recipes.feed import get_feed
+from recipes.models import (Basket, Favorites, Ingredient, Recipe,
+                            ShoppingCartItem, Tag)
+from recipes.search import ingredient_index, ranked_search
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.status import (HTTP_201_CREATED, HTTP_204_NO_CONTENT,
                                    HTTP_400_BAD_REQUEST)
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
+from users.models import Follow
 
 from .filters import RecipeFilter
+from .pagination import FeedPagination, RecipeCursorPagination
 from .permissions import AuthorOrAdminOrReadOnly, IsAuthenticatedOrAdmin
 from .serializers import (IngredientSerializer, RecipeSerializer,
-                          ShortRecipeSerializer, TagSerializer)
+                          ShoppingCartItemSerializer, ShortRecipeSerializer,
+                          TagSerializer, tag_catalogue)
+from .shopping_list import RENDERERS, get_shopping_list
+
+User = get_user_model()
 
 
 class IngredientViewSet(ReadOnlyModelViewSet):
@@ -22,15 +37,26 @@ class IngredientViewSet(ReadOnlyModelViewSet):
     pagination_class = None
 
     def get_queryset(self):
-        name = self.request.query_params['name'].lower()
-        starts_with_queryset = list(
-            self.queryset.filter(name__istartswith=name)
-        )
-        cont_queryset = self.queryset.filter(name__icontains=name)
-        starts_with_queryset.extend(
-            [x for x in cont_queryset if x not in starts_with_queryset]
-        )
-        return starts_with_queryset
+        name = self.request.query_params.get('name')
+        if not name:
+            return super().get_queryset()
+        if settings.INGREDIENT_SEARCH == 'database':
+            return ranked_search(super().get_queryset(), name)
+        return ingredient_index.search(name)
+
+
+def tag_catalogue_etag(request, *args, **kwargs):
+    return tag_catalogue.get()['etag']
+
+
+def tag_catalogue_modified(request, *args, **kwargs):
+    return tag_catalogue.get()['modified']
+
+
+tag_catalogue_condition = method_decorator(condition(
+    etag_func=tag_catalogue_etag,
+    last_modified_func=tag_catalogue_modified
+))
 
 
 class TagViewSet(ReadOnlyModelViewSet):
@@ -38,6 +64,17 @@ class TagViewSet(ReadOnlyModelViewSet):
     serializer_class = TagSerializer
     pagination_class = None
 
+    @tag_catalogue_condition
+    def list(self, request, *args, **kwargs):
+        return Response(tag_catalogue.get()['tags'])
+
+    @tag_catalogue_condition
+    def retrieve(self, request, pk=None):
+        tags = tag_catalogue.get()['by_id']
+        if not pk.isdigit() or int(pk) not in tags:
+            raise Http404
+        return Response(tags[int(pk)])
+
 
 class RecipeViewSet(ModelViewSet):
     queryset = Recipe.objects.all()
@@ -46,68 +83,125 @@ class RecipeViewSet(ModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    @property
+    def paginator(self):
+        request = getattr(self, 'request', None)
+        if (request is not None
+                and request.query_params.get('pagination') == 'cursor'):
+            self.pagination_class = RecipeCursorPagination
+        return super().paginator
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset
+        return queryset.annotate(
+            is_favorited=Exists(Favorites.objects.filter(
+                user=user,
+                recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(Basket.objects.filter(
+                user=user,
+                recipe=OuterRef('pk')
+            )),
+            is_subscribed=Exists(Follow.objects.filter(
+                user=user,
+                author=OuterRef('author')
+            ))
+        )
+
+    @transaction.atomic
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
+        change_counter(
+            User.objects.filter(id=self.request.user.id), 'recipes_count', 1
+        )
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        cart.lock_recipe(instance.id)
+        cart.subtract_recipe_ingredients(instance.id)
+        instance.delete()
+        change_counter(
+            User.objects.filter(id=instance.author_id), 'recipes_count', -1
+        )
+
+    @action(detail=False, permission_classes=(IsAuthenticatedOrAdmin,))
+    def feed(self, request):
+        paginator = FeedPagination()
+        ids = paginator.paginate_feed(
+            request,
+            lambda before, limit: get_feed(request.user, before, limit)
+        )
+        recipes = self.get_queryset().filter(id__in=ids)
+        serializer = self.get_serializer(recipes, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, permission_classes=(IsAuthenticatedOrAdmin,))
+    def shopping_cart_totals(self, request):
+        serializer = ShoppingCartItemSerializer(
+            ShoppingCartItem.objects.filter(user=request.user).select_related(
+                'ingredient'
+            ).order_by('ingredient__name'),
+            many=True
+        )
+        return Response(serializer.data)
 
     @action(detail=False, permission_classes=(IsAuthenticatedOrAdmin,))
     def download_shopping_cart(self, request):
-        if not Basket.objects.filter(
-                user=request.user
-        ).exists():
+        file_type = request.query_params.get('type', 'txt')
+        if file_type not in RENDERERS:
+            return Response(
+                {'errors': 'Неподдерживаемый формат списка покупок'},
+                status=HTTP_400_BAD_REQUEST
+            )
+        ingredients = get_shopping_list(request.user)
+        if not ingredients:
             return Response(
                 {'errors': 'В Корзине отсутствуют рецепты'},
                 status=HTTP_400_BAD_REQUEST
             )
-        ingredients = IngredientRecipe.objects.filter(
-            recipes__baskets__user=request.user
-        ).values(
-            'ingredient__name',
-            'ingredient__measurement_unit'
-        ).annotate(amount=Sum('amount'))
-        shopping_list = ''
-        for ingredient in ingredients:
-            item = (f'* {ingredient["ingredient__name"]} '
-                    f'({ingredient["ingredient__measurement_unit"]}) -- '
-                    f'{ingredient["amount"]}\n\n'
-                    )
-            shopping_list += item
-        return HttpResponse(shopping_list,
-                            content_type='text/plain;charset=UTF-8'
-                            )
+        render, content_type = RENDERERS[file_type]
+        response = StreamingHttpResponse(
+            render(ingredients),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_list.{file_type}"'
+        )
+        return response
 
     @action(methods=['post', 'delete'],
             detail=True,
             permission_classes=(IsAuthenticatedOrAdmin,)
             )
     def shopping_cart(self, request, pk):
-        recipe = get_object_or_404(Recipe, id=pk)
         if request.method == 'POST':
-            serializer = ShortRecipeSerializer(recipe)
-            if Basket.objects.filter(
-                user=request.user,
-                recipe=recipe
-            ).exists():
+            recipe = get_object_or_404(Recipe, id=pk)
+            with transaction.atomic():
+                cart.lock_recipe(recipe.id)
+                added = Basket.relations.add(request.user.id, recipe.id)
+                if added:
+                    cart.add_recipe(request.user.id, recipe.id)
+            if not added:
                 return Response(
                     {'errors': 'Данный рецепт уже есть в списке покупок'},
                     status=HTTP_400_BAD_REQUEST
                 )
-            Basket.objects.create(
-                user=request.user,
-                recipe=recipe
-            )
+            serializer = ShortRecipeSerializer(recipe)
             return Response(serializer.data, status=HTTP_201_CREATED)
-        if not Basket.objects.filter(
-            user=request.user,
-            recipe=recipe
-        ).exists():
+        with transaction.atomic():
+            cart.lock_recipe(pk)
+            removed = Basket.relations.remove(request.user.id, pk)
+            if removed:
+                cart.remove_recipe(request.user.id, pk)
+        if not removed:
+            get_object_or_404(Recipe, id=pk)
             return Response(
                 {'errors': 'Данный рецепт в Корзине отсутствует'},
                 status=HTTP_400_BAD_REQUEST
             )
-        Basket.objects.filter(
-            user=request.user,
-            recipe=recipe
-        ).delete()
         return Response(status=HTTP_204_NO_CONTENT)
 
     @action(methods=['post', 'delete'],
@@ -115,32 +209,33 @@ class RecipeViewSet(ModelViewSet):
             permission_classes=(IsAuthenticatedOrAdmin,)
             )
     def favorite(self, request, pk):
-        recipe = get_object_or_404(Recipe, id=pk)
         if request.method == 'POST':
-            serializer = ShortRecipeSerializer(recipe)
-            if Favorites.objects.filter(
-                user=request.user,
-                recipe=recipe
-            ).exists():
+            recipe = get_object_or_404(Recipe, id=pk)
+            with transaction.atomic():
+                added = Favorites.relations.add(request.user.id, recipe.id)
+                if added:
+                    change_counter(
+                        Recipe.objects.filter(id=recipe.id),
+                        'favorites_count',
+                        1
+                    )
+            if not added:
                 return Response(
                     {'errors': 'Данный рецепт уже добавлен в Избранное'},
                     status=HTTP_400_BAD_REQUEST
                 )
-            Favorites.objects.create(
-                user=request.user,
-                recipe=recipe
-            )
+            serializer = ShortRecipeSerializer(recipe)
             return Response(serializer.data, status=HTTP_201_CREATED)
-        if not Favorites.objects.filter(
-            user=request.user,
-            recipe=recipe
-        ).exists():
+        with transaction.atomic():
+            removed = Favorites.relations.remove(request.user.id, pk)
+            if removed:
+                change_counter(
+                    Recipe.objects.filter(id=pk), 'favorites_count', -1
+                )
+        if not removed:
+            get_object_or_404(Recipe, id=pk)
             return Response(
                 {'errors': 'Данный рецепт отсутствует в Избранном'},
                 status=HTTP_400_BAD_REQUEST
             )
-        Favorites.objects.filter(
-            user=request.user,
-            recipe=recipe
-        ).delete()
         return Response(status=HTTP_204_NO_CONTENT)
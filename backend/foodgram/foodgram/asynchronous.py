@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from threading import Lock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpResponse
+
+_executor = None
+_executor_lock = Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ASYNC_VIEW_THREADS,
+                thread_name_prefix='views'
+            )
+        return _executor
+
+
+def call_in_thread(view, request, *args, **kwargs):
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render') and callable(response.render):
+            response.render()
+        if not response.streaming:
+            return response
+        # Ответ собирается здесь: под ASGI Django перебирает
+        # streaming_content в цикле событий и блокирует его.
+        collected = HttpResponse(
+            b''.join(response.streaming_content),
+            status=response.status_code
+        )
+        for header, value in response.items():
+            collected[header] = value
+        return collected
+    finally:
+        close_old_connections()
+
+
+def async_view(view):
+    """Асинхронная обёртка синхронного представления для ASGI.
+    Django 3.2 выполняет все синхронные представления процесса в одном
+    потоке, а обёрнутое выполняется в пуле из ASYNC_VIEW_THREADS потоков
+    со своими соединениями с БД: медленный запрос или клиент не
+    задерживает остальные."""
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        return await sync_to_async(
+            call_in_thread,
+            thread_sensitive=False,
+            executor=get_executor()
+        )(view, request, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,42 @@
+from django.db import connections, models, router
+
+
+class RelationManager(models.Manager):
+    """Связь пользователя с объектом, которая добавляется и удаляется
+    одним запросом: повторный клик не приводит к IntegrityError.
+    Подключается к модели дополнительным менеджером relations, чтобы
+    add и remove не попадали в менеджеры связей вроде user.baskets."""
+
+    def __init__(self, target):
+        super().__init__()
+        self.target = target
+
+    def execute(self, sql, params):
+        connection = connections[router.db_for_write(self.model)]
+        quote = connection.ops.quote_name
+        meta = self.model._meta
+        sql = sql.format(
+            insert=connection.ops.insert_statement(ignore_conflicts=True),
+            on_conflict=connection.ops.ignore_conflicts_suffix_sql(
+                ignore_conflicts=True
+            ),
+            table=quote(meta.db_table),
+            user=quote(meta.get_field('user').column),
+            target=quote(meta.get_field(self.target).column)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+
+    def add(self, user_id, target_id):
+        return self.execute(
+            '{insert} {table} ({user}, {target}) '
+            'VALUES (%s, %s) {on_conflict}',
+            (user_id, target_id)
+        ) == 1
+
+    def remove(self, user_id, target_id):
+        return self.execute(
+            'DELETE FROM {table} WHERE {user} = %s AND {target} = %s',
+            (user_id, target_id)
+        ) == 1
@@ -0,0 +1,139 @@
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .metrics import REQUEST_DURATION, REQUEST_QUERIES, get_view_name
+from .profiling import QueryProfile, current_profile, wrap_queries
+
+logger = logging.getLogger('foodgram.profiling')
+
+
+class QueryObserverMiddleware(ABC):
+    """Основа middleware, которое следит за запросами к БД во время
+    обработки запроса. Поддерживает и WSGI, и ASGI: под ASGI не
+    переводит асинхронные представления в общий синхронный поток."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        observer = self.get_observer()
+        started = perf_counter()
+        with self.observe(observer):
+            response = self.get_response(request)
+        self.process(request, response, observer, perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        observer = self.get_observer()
+        started = perf_counter()
+        with self.observe(observer):
+            response = await self.get_response(request)
+        self.process(request, response, observer, perf_counter() - started)
+        return response
+
+    def observe(self, observer):
+        return wrap_queries(observer)
+
+    @abstractmethod
+    def get_observer(self):
+        """Наблюдатель, через который проходят запросы к БД."""
+
+    @abstractmethod
+    def process(self, request, response, observer, total):
+        """Обработка ответа по данным наблюдателя."""
+
+
+class QueryProfilingMiddleware(QueryObserverMiddleware):
+    """Профилирование SQL-запросов: заголовок Server-Timing и журнал
+    медленных запросов. Включается настройкой SQL_PROFILING."""
+
+    def __init__(self, get_response):
+        if not settings.SQL_PROFILING:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def get_observer(self):
+        return QueryProfile()
+
+    @contextmanager
+    def observe(self, profile):
+        token = current_profile.set(profile)
+        try:
+            with wrap_queries(profile):
+                yield
+        finally:
+            current_profile.reset(token)
+
+    def process(self, request, response, profile, total):
+        response['Server-Timing'] = profile.server_timing(total)
+        duplicates = profile.duplicates()
+        if (total * 1000 >= settings.SQL_PROFILING_SLOW_MS
+                or profile.count >= settings.SQL_PROFILING_MAX_QUERIES
+                or any(
+                    duplicate['count'] >= settings.SQL_PROFILING_DUPLICATES
+                    for duplicate in duplicates
+                )):
+            logger.warning(json.dumps({
+                'method': request.method,
+                'path': request.get_full_path(),
+                'status': response.status_code,
+                'user': getattr(request.user, 'pk', None)
+                if hasattr(request, 'user') else None,
+                'total_ms': round(total * 1000, 1),
+                'db_ms': round(profile.duration * 1000, 1),
+                'queries': profile.count,
+                'timings_ms': {
+                    name: round(duration * 1000, 1)
+                    for name, duration in profile.timings.items()
+                },
+                'duplicates': duplicates[:10],
+            }, ensure_ascii=False))
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware(QueryObserverMiddleware):
+    """Время ответа и число запросов к БД по представлениям API.
+    Включается настройкой METRICS."""
+
+    def __init__(self, get_response):
+        if not settings.METRICS:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def get_observer(self):
+        return QueryCounter()
+
+    def process(self, request, response, counter, total):
+        match = getattr(request, 'resolver_match', None)
+        view = (
+            'unresolved' if match is None
+            else get_view_name(match.func, request.method)
+        )
+        REQUEST_DURATION.labels(
+            view,
+            request.method,
+            f'{response.status_code // 100}xx'
+        ).observe(total)
+        REQUEST_QUERIES.labels(view).observe(counter.count)
@@ -0,0 +1,134 @@
+import os
+import re
+import traceback
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from rest_framework.serializers import ListSerializer
+
+current_profile = ContextVar('current_profile', default=None)
+# Обёртки execute_wrapper текущего запроса. Хранятся в контексте, а не
+# в соединении: под ASGI запрос выполняется в потоках, отличных от того,
+# где работает middleware.
+query_wrappers = ContextVar('query_wrappers', default=())
+
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+PLACEHOLDER_LISTS = re.compile(r'(?:%s|\?)(?:\s*,\s*(?:%s|\?))+')
+
+
+def get_fingerprint(sql):
+    return PLACEHOLDER_LISTS.sub('%s, ...', LITERALS.sub('?', sql))
+
+
+def get_call_site():
+    """Ближайший к запросу кадр стека из кода проекта."""
+    for frame in reversed(traceback.extract_stack()[:-3]):
+        filename = frame.filename
+        if (filename.startswith(settings.BASE_DIR)
+                and 'site-packages' not in filename
+                and filename != __file__):
+            path = os.path.relpath(filename, settings.BASE_DIR)
+            return f'{path}:{frame.lineno} {frame.name}'
+    return None
+
+
+class QueryProfile:
+    """Счётчики запросов к БД за время обработки одного запроса."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+        self.fingerprints = Counter()
+        self.call_sites = {}
+        self.timings = defaultdict(float)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += perf_counter() - started
+            self.count += 1
+            fingerprint = get_fingerprint(sql)
+            self.fingerprints[fingerprint] += 1
+            if self.fingerprints[fingerprint] == 2:
+                self.call_sites[fingerprint] = get_call_site()
+
+    def duplicates(self):
+        return [
+            {
+                'sql': fingerprint,
+                'count': count,
+                'call_site': self.call_sites.get(fingerprint),
+            }
+            for fingerprint, count in self.fingerprints.most_common()
+            if count > 1
+        ]
+
+    def server_timing(self, total):
+        metrics = [
+            f'db;dur={self.duration * 1000:.1f};desc="{self.count} queries"'
+        ]
+        metrics.extend(
+            f'{name};dur={duration * 1000:.1f}'
+            for name, duration in self.timings.items()
+        )
+        metrics.append(f'app;dur={(total - self.duration) * 1000:.1f}')
+        metrics.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(metrics)
+
+
+def dispatch_query(execute, sql, params, many, context):
+    for wrapper in reversed(query_wrappers.get()):
+        execute = partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_dispatcher(sender, connection, **kwargs):
+    if dispatch_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(dispatch_query)
+
+
+@contextmanager
+def wrap_queries(wrapper):
+    for connection in connections.all():
+        install_dispatcher(None, connection)
+    token = query_wrappers.set((*query_wrappers.get(), wrapper))
+    try:
+        yield
+    finally:
+        query_wrappers.reset(token)
+
+
+@contextmanager
+def timed(name):
+    profile = current_profile.get()
+    if profile is None:
+        yield
+        return
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        profile.timings[name] += perf_counter() - started
+
+
+class ProfiledDataMixin:
+    """Учитывает время сборки serializer.data в профиле запроса."""
+
+    @property
+    def data(self):
+        with timed('serializer'):
+            return super().data
+
+
+class ProfiledListSerializer(ProfiledDataMixin, ListSerializer):
+    pass
@@ -35,6 +35,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram.middleware.MetricsMiddleware',
+    'foodgram.middleware.QueryProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -75,6 +77,17 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+SHARED_CACHE = not CACHES['default']['BACKEND'].endswith('LocMemCache')
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -108,6 +121,48 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 AUTH_USER_MODEL = 'users.User'
 
+INGREDIENT_SEARCH = os.getenv('INGREDIENT_SEARCH', 'index')
+
+# Фрагменты рецептов сбрасываются сдвигом версии в кеше. LocMemCache у
+# каждого процесса gunicorn свой, и после правки рецепта остальные процессы
+# отдавали бы старый фрагмент, поэтому без общего кеша (Memcached)
+# фрагменты не кешируются.
+RECIPE_FRAGMENT_CACHE = os.getenv(
+    'RECIPE_FRAGMENT_CACHE', str(SHARED_CACHE)
+) == 'True'
+RECIPE_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+FEED_FAN_OUT_MAX_FOLLOWERS = int(os.getenv('FEED_FAN_OUT_MAX_FOLLOWERS', 1000))
+# Раскладка возобновляется с запасом ниже порога, чтобы отписки и подписки
+# около него не перекладывали рецепты автора по лентам каждый раз.
+FEED_FAN_OUT_RESUME_FOLLOWERS = int(os.getenv(
+    'FEED_FAN_OUT_RESUME_FOLLOWERS', FEED_FAN_OUT_MAX_FOLLOWERS // 2
+))
+
+SQL_PROFILING = os.getenv('SQL_PROFILING', 'False') == 'True'
+SQL_PROFILING_SLOW_MS = int(os.getenv('SQL_PROFILING_SLOW_MS', 500))
+SQL_PROFILING_MAX_QUERIES = int(os.getenv('SQL_PROFILING_MAX_QUERIES', 30))
+SQL_PROFILING_DUPLICATES = int(os.getenv('SQL_PROFILING_DUPLICATES', 5))
+
+METRICS = os.getenv('METRICS', 'False') == 'True'
+
+# Под ASGI часть эндпоинтов API выполняется в отдельном пуле потоков,
+# см. foodgram.asynchronous. asgi.py включает это по умолчанию.
+ASYNC_API_VIEWS = os.getenv('ASYNC_API_VIEWS', 'False') == 'True'
+ASYNC_VIEW_THREADS = int(os.getenv('ASYNC_VIEW_THREADS', 16))
+
+IMAGE_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+IMAGE_MAX_SIDE = 6000
+IMAGE_RENDITIONS = {
+    'thumbnail': (200, 200),
+    'card': (600, 600),
+    'full': (1600, 1600),
+}
+IMAGE_RENDITION_WORKERS = int(os.getenv('IMAGE_RENDITION_WORKERS', 2))
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
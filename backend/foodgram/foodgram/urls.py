@@ -3,6 +3,7 @@ from django.contrib import admin
 from django.urls import include, path
 
 from . import settings
+from .metrics import metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -10,6 +11,9 @@ urlpatterns = [
     path('api/', include('users.urls'))
 ]
 
+if settings.METRICS:
+    urlpatterns.append(path('metrics', metrics))
+
 if settings.DEBUG:
     urlpatterns += static(
         settings.MEDIA_URL,
@@ -1,6 +1,8 @@
 from django.contrib import admin
-from django.contrib.admin import ModelAdmin
+from django.contrib.admin import ModelAdmin, TabularInline
 
+from .cart import (rebuild_recipe_totals, rebuild_totals,
+                   subtract_recipe_ingredients)
 from .models import (Basket, Favorites, Ingredient, IngredientRecipe, Recipe,
                      Tag)
 
@@ -10,18 +12,70 @@ class IngredientAdmin(ModelAdmin):
     search_fields = ('name',)
 
 
+class IngredientRecipeInline(TabularInline):
+    model = IngredientRecipe
+    min_num = 1
+    extra = 0
+
+
 class RecipeAdmin(ModelAdmin):
     list_display = ('name', 'author', 'count_favorites')
     list_filter = ('author', 'name', 'tags')
     search_fields = ('name',)
+    inlines = (IngredientRecipeInline,)
 
+    @admin.display(
+        description='Количество добавлений в Избранное',
+        ordering='favorites_count'
+    )
     def count_favorites(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        if change:
+            rebuild_recipe_totals(form.instance.id)
+
+    def delete_model(self, request, obj):
+        subtract_recipe_ingredients(obj.id)
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        for recipe_id in queryset.values_list('id', flat=True):
+            subtract_recipe_ingredients(recipe_id)
+        super().delete_queryset(request, queryset)
+
+
+class IngredientRecipeAdmin(ModelAdmin):
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        rebuild_recipe_totals(obj.recipe_id)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        rebuild_recipe_totals(obj.recipe_id)
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = set(queryset.values_list('recipe_id', flat=True))
+        super().delete_queryset(request, queryset)
+        for recipe_id in recipe_ids:
+            rebuild_recipe_totals(recipe_id)
+
+
+class BasketAdmin(ModelAdmin):
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        rebuild_totals([obj.user_id])
+
+    def delete_queryset(self, request, queryset):
+        users = set(queryset.values_list('user_id', flat=True))
+        super().delete_queryset(request, queryset)
+        rebuild_totals(users)
 
 
 admin.site.register(Tag)
 admin.site.register(Ingredient, IngredientAdmin)
 admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(Favorites)
-admin.site.register(Basket)
-admin.site.register(IngredientRecipe)
+admin.site.register(Basket, BasketAdmin)
+admin.site.register(IngredientRecipe, IngredientRecipeAdmin)
@@ -0,0 +1,96 @@
+from threading import Lock
+from time import time
+
+from django.core.cache import cache
+from django.db import transaction
+from foodgram.metrics import count_cache
+
+INGREDIENTS_VERSION = 'ingredients_version'
+TAGS_VERSION = 'tags_version'
+RECIPES_VERSION = 'recipes_version'
+RECIPE_VERSION = 'recipe_version:{}'
+USER_VERSION = 'user_version:{}'
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, int(time() * 1000), None)
+        return cache.get(key)
+
+
+def get_versions(*keys):
+    versions = cache.get_many(keys)
+    return tuple(
+        versions[key] if key in versions else get_version(key)
+        for key in keys
+    )
+
+
+def bump_version_now_and_on_commit(key):
+    """Повторный сдвиг после коммита отбрасывает то, что успели
+    закешировать параллельные запросы, пока транзакция была открыта."""
+    bump_version(key)
+    transaction.on_commit(lambda: bump_version(key))
+
+
+def invalidate(version_key):
+    for local_cache in LocalCache.instances:
+        if local_cache.version_key == version_key:
+            local_cache.invalidate()
+    transaction.on_commit(lambda: bump_version(version_key))
+
+
+class LocalCache:
+    """Значение в памяти процесса, сбрасываемое по версии в общем кеше."""
+
+    instances = []
+
+    def __init__(self, version_key, build):
+        self.version_key = version_key
+        self.build = build
+        self._lock = Lock()
+        self._state = None
+        self.instances.append(self)
+
+    def invalidate(self):
+        self._state = None
+
+    def get(self):
+        version = get_version(self.version_key)
+        state = self._state
+        if state is not None and state[0] == version:
+            count_cache(self.version_key, hits=1)
+            return state[1]
+        with self._lock:
+            if self._state is None or self._state[0] != version:
+                count_cache(self.version_key, misses=1)
+                self._state = (version, self.load(version))
+            return self._state[1]
+
+    def load(self, version):
+        return self.build()
+
+
+class SharedCache(LocalCache):
+    """LocalCache, собранное значение которого хранится и в общем кеше."""
+
+    def load(self, version):
+        key = f'{self.version_key}:value:{version}'
+        value = cache.get(key)
+        if value is None:
+            count_cache(f'{self.version_key}:shared', misses=1)
+            value = self.build()
+            cache.set(key, value, None)
+        else:
+            count_cache(f'{self.version_key}:shared', hits=1)
+        return value
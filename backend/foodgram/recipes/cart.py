@@ -0,0 +1,137 @@
+from django.db import connection
+from django.db.models import F, Sum, Value
+
+from .models import Basket, IngredientRecipe, Recipe, ShoppingCartItem
+
+UPSERT_SQL = '''
+INSERT INTO {table} ({user}, {ingredient}, {amount}) {sql}
+ON CONFLICT ({user}, {ingredient})
+DO UPDATE SET {amount} = {table}.{amount} + EXCLUDED.{amount}
+'''
+
+
+def add_to_totals(queryset):
+    """Прибавляет к итогам строки queryset: пользователь, ингредиент,
+    количество. Отрицательное количество вычитает."""
+    quote = connection.ops.quote_name
+    meta = ShoppingCartItem._meta
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            UPSERT_SQL.format(
+                table=quote(meta.db_table),
+                user=quote(meta.get_field('user').column),
+                ingredient=quote(meta.get_field('ingredient').column),
+                amount=quote(meta.get_field('amount').column),
+                sql=sql
+            ),
+            params
+        )
+
+
+def get_user_rows(user_id, recipe_id, sign):
+    return IngredientRecipe.objects.filter(recipe_id=recipe_id).annotate(
+        cart_user=Value(user_id),
+        cart_ingredient=F('ingredient'),
+        total=F('amount') * sign
+    ).values_list('cart_user', 'cart_ingredient', 'total')
+
+
+def get_basket_rows(recipe_id, sign):
+    return IngredientRecipe.objects.filter(
+        recipe_id=recipe_id,
+        recipe__baskets__isnull=False
+    ).annotate(
+        cart_user=F('recipe__baskets__user'),
+        cart_ingredient=F('ingredient'),
+        total=F('amount') * sign
+    ).values_list('cart_user', 'cart_ingredient', 'total')
+
+
+def lock_recipe(recipe_id):
+    """Блокирует строку рецепта до конца транзакции: правка состава
+    и добавление в корзину или удаление из неё идут по очереди, иначе
+    итоги корзины считаются по старому составу. Вызывается до записи
+    в Basket, которая берёт на рецепт свою блокировку."""
+    return Recipe.objects.select_for_update().filter(pk=recipe_id).exists()
+
+
+def add_recipe(user_id, recipe_id):
+    add_to_totals(get_user_rows(user_id, recipe_id, 1))
+
+
+def remove_recipe(user_id, recipe_id):
+    add_to_totals(get_user_rows(user_id, recipe_id, -1))
+    ShoppingCartItem.objects.filter(user_id=user_id, amount__lte=0).delete()
+
+
+def subtract_recipe_ingredients(recipe_id):
+    """Вызывается перед сменой состава рецепта, после неё —
+    add_recipe_ingredients."""
+    add_to_totals(get_basket_rows(recipe_id, -1))
+    ShoppingCartItem.objects.filter(
+        user__in=Basket.objects.filter(recipe_id=recipe_id).values('user'),
+        ingredient__in=IngredientRecipe.objects.filter(
+            recipe_id=recipe_id
+        ).values('ingredient'),
+        amount__lte=0
+    ).delete()
+
+
+def add_recipe_ingredients(recipe_id):
+    add_to_totals(get_basket_rows(recipe_id, 1))
+
+
+def get_aggregated_totals(users=None):
+    if users is None:
+        queryset = IngredientRecipe.objects.filter(
+            recipe__baskets__isnull=False
+        )
+    else:
+        queryset = IngredientRecipe.objects.filter(
+            recipe__baskets__user__in=users
+        )
+    return queryset.values(
+        'recipe__baskets__user', 'ingredient'
+    ).annotate(
+        total=Sum('amount')
+    ).values_list('recipe__baskets__user', 'ingredient', 'total')
+
+
+def rebuild_totals(users=None):
+    items = ShoppingCartItem.objects.all()
+    if users is not None:
+        items = items.filter(user__in=users)
+    items.delete()
+    add_to_totals(get_aggregated_totals(users))
+
+
+def rebuild_recipe_totals(recipe_id):
+    rebuild_totals(list(
+        Basket.objects.filter(recipe_id=recipe_id).values_list(
+            'user_id', flat=True
+        )
+    ))
+
+
+def check_totals(users=None):
+    """Расхождения итогов с агрегацией по корзинам:
+    (пользователь, ингредиент, ожидаемое, сохранённое)."""
+    items = ShoppingCartItem.objects.all()
+    if users is not None:
+        items = items.filter(user__in=users)
+    expected = {
+        (user, ingredient): total
+        for user, ingredient, total in get_aggregated_totals(users)
+    }
+    stored = {
+        (user, ingredient): amount
+        for user, ingredient, amount in items.values_list(
+            'user', 'ingredient', 'amount'
+        )
+    }
+    return sorted(
+        (*key, expected.get(key), stored.get(key))
+        for key in expected.keys() | stored.keys()
+        if expected.get(key) != stored.get(key)
+    )
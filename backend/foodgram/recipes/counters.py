@@ -0,0 +1,55 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from users.models import Follow
+
+from .models import Favorites, Recipe
+
+User = get_user_model()
+
+
+def change_counter(queryset, field, delta):
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def count_subquery(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+                field
+            ).annotate(count=Count('pk')).values('count'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+def repair_counter(queryset, field, actual):
+    drifted = queryset.annotate(actual=actual).exclude(
+        **{field: F('actual')}
+    )
+    return queryset.filter(pk__in=drifted.values('pk')).update(
+        **{field: actual}
+    )
+
+
+def recount():
+    return {
+        'favorites_count': repair_counter(
+            Recipe.objects.all(),
+            'favorites_count',
+            count_subquery(Favorites.objects.all(), 'recipe')
+        ),
+        'recipes_count': repair_counter(
+            User.objects.all(),
+            'recipes_count',
+            count_subquery(Recipe.objects.all(), 'author')
+        ),
+        'followers_count': repair_counter(
+            User.objects.all(),
+            'followers_count',
+            count_subquery(Follow.objects.all(), 'author')
+        ),
+    }
@@ -0,0 +1,128 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Value
+from users.models import Follow
+
+from .models import FeedItem, Recipe
+
+User = get_user_model()
+
+
+def insert_into_feed(queryset, columns):
+    """Переносит строки queryset в ленту одним INSERT ... SELECT."""
+    quote = connection.ops.quote_name
+    meta = FeedItem._meta
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            '{insert} {table} ({columns}) {sql} {on_conflict}'.format(
+                insert=connection.ops.insert_statement(ignore_conflicts=True),
+                table=quote(meta.db_table),
+                columns=', '.join(
+                    quote(meta.get_field(column).column) for column in columns
+                ),
+                sql=sql,
+                on_conflict=connection.ops.ignore_conflicts_suffix_sql(
+                    ignore_conflicts=True
+                )
+            ),
+            params
+        )
+        return cursor.rowcount
+
+
+def fan_out(recipe):
+    """Раскладывает новый рецепт по лентам подписчиков. Рецепты авторов
+    с выключенной раскладкой лента подмешивает при чтении."""
+    return insert_into_feed(
+        Follow.objects.filter(
+            author_id=recipe.author_id,
+            author__feed_fan_out=True
+        ).annotate(
+            feed_recipe=Value(recipe.id)
+        ).values_list('user_id', 'feed_recipe'),
+        ('user', 'recipe')
+    )
+
+
+def backfill(author_id):
+    """Доставляет рецепты автора в ленты всех его подписчиков."""
+    return insert_into_feed(
+        Recipe.objects.filter(
+            author_id=author_id,
+            author__follower__isnull=False
+        ).values_list('id', 'author__follower__user'),
+        ('recipe', 'user')
+    )
+
+
+def follow(user_id, author_id):
+    """Вызывается в транзакции подписки после обновления счётчика."""
+    User.objects.filter(
+        id=author_id,
+        feed_fan_out=True,
+        followers_count__gt=settings.FEED_FAN_OUT_MAX_FOLLOWERS
+    ).update(feed_fan_out=False)
+    return insert_into_feed(
+        Recipe.objects.filter(author_id=author_id).annotate(
+            follower=Value(user_id)
+        ).values_list('id', 'follower'),
+        ('recipe', 'user')
+    )
+
+
+def unfollow(user_id, author_id):
+    """Вызывается в транзакции отписки после обновления счётчика."""
+    FeedItem.objects.filter(
+        user_id=user_id,
+        recipe__author_id=author_id
+    ).delete()
+    # Рецепты, опубликованные без раскладки, доставляются один раз:
+    # при переключении флага, которое строка автора сериализует.
+    if User.objects.filter(
+        id=author_id,
+        feed_fan_out=False,
+        followers_count__lte=settings.FEED_FAN_OUT_RESUME_FOLLOWERS
+    ).update(feed_fan_out=True):
+        return backfill(author_id)
+    return 0
+
+
+def rebuild_feed():
+    FeedItem.objects.all().delete()
+    User.objects.filter(
+        followers_count__gt=settings.FEED_FAN_OUT_MAX_FOLLOWERS
+    ).update(feed_fan_out=False)
+    User.objects.filter(
+        followers_count__lte=settings.FEED_FAN_OUT_MAX_FOLLOWERS
+    ).update(feed_fan_out=True)
+    return insert_into_feed(
+        Recipe.objects.filter(
+            author__feed_fan_out=True,
+            author__follower__isnull=False
+        ).values_list('id', 'author__follower__user'),
+        ('recipe', 'user')
+    )
+
+
+def get_feed(user, before=None, limit=6):
+    """Id рецептов ленты по убыванию, не больше limit."""
+    items = FeedItem.objects.filter(user=user)
+    if before is not None:
+        items = items.filter(recipe_id__lt=before)
+    ids = set(items.order_by('-recipe_id').values_list(
+        'recipe_id', flat=True
+    )[:limit])
+    authors = list(Follow.objects.filter(
+        user=user,
+        author__feed_fan_out=False
+    ).values_list('author_id', flat=True))
+    if authors:
+        recipes = Recipe.objects.filter(author_id__in=authors)
+        if before is not None:
+            recipes = recipes.filter(id__lt=before)
+        ids.update(recipes.order_by('-id').values_list('id', flat=True)[
+            :limit
+        ])
+    return sorted(ids, reverse=True)[:limit]
@@ -0,0 +1,125 @@
+import logging
+import posixpath
+from base64 import b64decode
+from binascii import Error as BinasciiError
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+from threading import Lock
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import UploadedFile
+from foodgram.metrics import IMAGE_UPLOAD_BYTES
+from PIL import Image, ImageOps
+
+from .cache import RECIPE_VERSION, bump_version
+from .models import Recipe
+from .storage import image_storage
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+_executor = None
+_executor_lock = Lock()
+
+
+def read_base64_image(payload):
+    """Декодирует base64 частями во временный файл, одновременно считая
+    sha256, и проверяет размеры картинки до её полной распаковки."""
+    if len(payload) * 3 // 4 > settings.IMAGE_MAX_UPLOAD_SIZE:
+        raise ValidationError('Размер картинки превышает допустимый')
+    file = SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+    digest = sha256()
+    try:
+        for start in range(0, len(payload), CHUNK_SIZE):
+            chunk = b64decode(payload[start:start + CHUNK_SIZE])
+            digest.update(chunk)
+            file.write(chunk)
+    except (BinasciiError, ValueError):
+        raise ValidationError('Картинка передана в неверном формате')
+    size = file.tell()
+    IMAGE_UPLOAD_BYTES.observe(size)
+    file.seek(0)
+    try:
+        image = Image.open(file)
+    except Exception:
+        raise ValidationError('Загрузите корректную картинку')
+    if image.format not in EXTENSIONS:
+        raise ValidationError('Неподдерживаемый формат картинки')
+    if max(image.size) > settings.IMAGE_MAX_SIDE:
+        raise ValidationError(
+            'Сторона картинки не должна превышать '
+            f'{settings.IMAGE_MAX_SIDE} пикселей'
+        )
+    file.seek(0)
+    return UploadedFile(
+        file=file,
+        name=f'{digest.hexdigest()}.{EXTENSIONS[image.format]}',
+        content_type=Image.MIME[image.format],
+        size=size
+    )
+
+
+def get_rendition_name(name, rendition):
+    directory, filename = posixpath.split(name)
+    return posixpath.join(
+        directory,
+        'renditions',
+        posixpath.splitext(filename)[0],
+        f'{rendition}.webp'
+    )
+
+
+def make_renditions(name):
+    """Уменьшенные копии в WebP, которых ещё нет в хранилище."""
+    targets = []
+    for rendition, size in settings.IMAGE_RENDITIONS.items():
+        rendition_name = get_rendition_name(name, rendition)
+        if not image_storage.exists(rendition_name):
+            targets.append((rendition_name, size))
+    if not targets:
+        return
+    with image_storage.open(name) as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+    for rendition_name, size in targets:
+        rendition = image.copy()
+        rendition.thumbnail(size, Image.LANCZOS)
+        buffer = BytesIO()
+        rendition.save(buffer, 'WEBP', quality=85)
+        image_storage.save(rendition_name, ContentFile(buffer.getvalue()))
+
+
+def process_recipe_image(recipe_id, name):
+    """Готовит уменьшенные копии и отмечает в рецепте, для какой
+    картинки они есть: сериализатор не проверяет хранилище."""
+    try:
+        make_renditions(name)
+        if Recipe.objects.filter(id=recipe_id, image=name).exclude(
+            image_renditions=name
+        ).update(image_renditions=name):
+            bump_version(RECIPE_VERSION.format(recipe_id))
+    except Exception:
+        logger.exception('Не удалось подготовить картинку %s', name)
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_RENDITION_WORKERS,
+                thread_name_prefix='renditions'
+            )
+        return _executor
+
+
+def schedule_renditions(recipe):
+    if recipe.image:
+        get_executor().submit(process_recipe_image, recipe.id, recipe.image.name)
@@ -0,0 +1,431 @@
+import csv
+import json
+from hashlib import sha256
+from io import BytesIO, StringIO
+from random import Random
+from time import monotonic
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Max
+from PIL import Image
+
+from recipes.cache import RECIPES_VERSION, TAGS_VERSION, bump_version
+from recipes.cart import rebuild_totals
+from recipes.counters import recount
+from recipes.feed import rebuild_feed
+from recipes.images import make_renditions
+from recipes.models import (Basket, Favorites, Ingredient, IngredientRecipe,
+                            Recipe, Tag)
+from recipes.storage import image_storage
+from users.models import Follow
+
+User = get_user_model()
+
+TABLES = {
+    'user': (User, True, False),
+    'tag': (Tag, True, False),
+    'recipe': (Recipe, True, False),
+    'recipe_tag': (Recipe.tags.through, False, False),
+    'recipe_ingredient': (IngredientRecipe, False, False),
+    'follow': (Follow, False, True),
+    'favorite': (Favorites, False, True),
+    'basket': (Basket, False, True),
+}
+JSONL_MODELS = ('user', 'tag', 'recipe', 'follow', 'favorite', 'basket')
+
+FIRST_NAMES = (
+    'Александр', 'Мария', 'Иван', 'Анна', 'Дмитрий', 'Елена', 'Сергей',
+    'Ольга', 'Андрей', 'Наталья', 'Михаил', 'Татьяна', 'Никита', 'Ирина'
+)
+LAST_NAMES = (
+    'Иванов', 'Смирнова', 'Кузнецов', 'Попова', 'Васильев', 'Петрова',
+    'Соколов', 'Михайлова', 'Новиков', 'Федорова', 'Морозов', 'Волкова'
+)
+DISHES = (
+    'Суп', 'Салат', 'Пирог', 'Рагу', 'Запеканка', 'Паста', 'Каша',
+    'Омлет', 'Плов', 'Котлеты', 'Блины', 'Десерт'
+)
+ADDITIONS = (
+    'по-домашнему', 'на скорую руку', 'с зеленью', 'с сыром', 'с грибами',
+    'по-деревенски', 'с овощами', 'по-итальянски', 'с курицей', 'с травами'
+)
+SENTENCES = (
+    'Нарежьте все ингредиенты небольшими кусочками.',
+    'Разогрейте духовку до 180 градусов.',
+    'Обжарьте на среднем огне до золотистого цвета.',
+    'Посолите и поперчите по вкусу.',
+    'Тушите под крышкой двадцать минут.',
+    'Перемешайте и дайте настояться.',
+    'Подавайте горячим, украсив зеленью.',
+)
+
+
+def parse_range(value):
+    low, _, high = value.partition('-')
+    try:
+        low, high = int(low), int(high or low)
+    except ValueError:
+        raise CommandError(f'Неверный диапазон: {value}')
+    if low < 0 or high < low:
+        raise CommandError(f'Неверный диапазон: {value}')
+    return low, high
+
+
+class Command(BaseCommand):
+    help = 'Генерация или импорт из JSONL данных для нагрузочных тестов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=0)
+        parser.add_argument('--tags', type=int, default=0)
+        parser.add_argument('--recipes', type=int, default=0)
+        parser.add_argument(
+            '--ingredients',
+            default='3-10',
+            help='Количество ингредиентов в рецепте, например 3-10'
+        )
+        parser.add_argument(
+            '--recipe-tags',
+            default='1-3',
+            help='Количество тегов у рецепта, например 1-3'
+        )
+        parser.add_argument(
+            '--follows',
+            type=int,
+            default=0,
+            help='Подписок у каждого нового пользователя'
+        )
+        parser.add_argument(
+            '--favorites',
+            type=int,
+            default=0,
+            help='Рецептов в избранном у каждого нового пользователя'
+        )
+        parser.add_argument(
+            '--baskets',
+            type=int,
+            default=0,
+            help='Рецептов в корзине у каждого нового пользователя'
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20000,
+            help='Количество записей одного вида в одной транзакции'
+        )
+        parser.add_argument(
+            '--password',
+            default='foodgram',
+            help='Пароль всех созданных пользователей'
+        )
+        parser.add_argument(
+            '--jsonl',
+            help='Импортировать записи из JSONL вместо генерации'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('Размер пакета должен быть больше нуля')
+        started = monotonic()
+        self.rng = Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.verbosity = options['verbosity']
+        self.passwords = {}
+        self.default_password = self.get_password(options['password'])
+        self.counts = dict.fromkeys(TABLES, 0)
+        self.defaults = {
+            kind: {
+                field.attname: field.get_default()
+                for field in model._meta.concrete_fields
+                if explicit_pk or not field.primary_key
+            }
+            for kind, (model, explicit_pk, ignore_conflicts) in TABLES.items()
+        }
+        self.next_ids = {
+            model: (model.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+            for model in (User, Tag, Recipe)
+        }
+        self.image = self.get_placeholder_image()
+        try:
+            if options['jsonl']:
+                self.load(self.read_jsonl(options['jsonl']))
+            else:
+                self.load(self.generate(options))
+        except DatabaseError as error:
+            raise CommandError(f'Загрузка остановлена: {error}')
+        self.reset_sequences()
+        with transaction.atomic():
+            recount()
+            rebuild_feed()
+            rebuild_totals()
+        bump_version(TAGS_VERSION)
+        bump_version(RECIPES_VERSION)
+        self.stdout.write(self.style.SUCCESS(
+            'Загружено: пользователей {user}, тегов {tag}, рецептов {recipe}, '
+            'ингредиентов в рецептах {recipe_ingredient}, подписок {follow}, '
+            'избранного {favorite}, корзин {basket} за {elapsed:.1f} с'.format(
+                elapsed=monotonic() - started,
+                **self.counts
+            )
+        ))
+
+    def get_password(self, password):
+        if password not in self.passwords:
+            self.passwords[password] = make_password(password)
+        return self.passwords[password]
+
+    def get_placeholder_image(self):
+        buffer = BytesIO()
+        Image.new('RGB', (960, 640), (238, 162, 96)).save(buffer, 'PNG')
+        content = buffer.getvalue()
+        name = image_storage.save(
+            f'recipes/images/{sha256(content).hexdigest()}.png',
+            ContentFile(content)
+        )
+        make_renditions(name)
+        return name
+
+    def allocate(self, model, record_id=None):
+        if record_id is None:
+            record_id = self.next_ids[model]
+        self.next_ids[model] = max(self.next_ids[model], record_id + 1)
+        return record_id
+
+    def row(self, kind, **values):
+        defaults = self.defaults[kind]
+        return kind, tuple(
+            values[name] if name in values else defaults[name]
+            for name in defaults
+        )
+
+    def load(self, records):
+        buffers = {kind: [] for kind in TABLES}
+        for kind, row in records:
+            buffers[kind].append(row)
+            if len(buffers[kind]) >= self.batch_size:
+                self.flush(buffers)
+        self.flush(buffers)
+
+    @transaction.atomic
+    def flush(self, buffers):
+        for kind, rows in buffers.items():
+            if rows:
+                self.write(kind, rows)
+                self.counts[kind] += len(rows)
+                rows.clear()
+        if self.verbosity > 1:
+            self.stdout.write(', '.join(
+                f'{kind}={count}' for kind, count in self.counts.items()
+            ))
+
+    def write(self, kind, rows):
+        model, explicit_pk, ignore_conflicts = TABLES[kind]
+        names = tuple(self.defaults[kind])
+        if connection.vendor != 'postgresql':
+            model.objects.bulk_create(
+                (model(**dict(zip(names, row))) for row in rows),
+                ignore_conflicts=ignore_conflicts
+            )
+            return
+        buffer = StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        quote = connection.ops.quote_name
+        table = quote(model._meta.db_table)
+        fields = [model._meta.get_field(name) for name in names]
+        columns = ', '.join(quote(field.column) for field in fields)
+        copy_options = 'FORMAT csv, FORCE_NOT_NULL ({})'.format(', '.join(
+            quote(field.column) for field in fields if not field.null
+        ))
+        with connection.cursor() as cursor, connection.wrap_database_errors:
+            if not ignore_conflicts:
+                cursor.copy_expert(
+                    f'COPY {table} ({columns}) FROM STDIN WITH ({copy_options})',
+                    buffer
+                )
+                return
+            cursor.execute(
+                'CREATE TEMPORARY TABLE generate_data_rows '
+                f'(LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP'
+            )
+            cursor.copy_expert(
+                f'COPY generate_data_rows ({columns}) FROM STDIN '
+                f'WITH ({copy_options})',
+                buffer
+            )
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) SELECT {columns} '
+                'FROM generate_data_rows ON CONFLICT DO NOTHING'
+            )
+            cursor.execute('DROP TABLE generate_data_rows')
+
+    def build_user(self, record):
+        user_id = self.allocate(User, record.get('id'))
+        password = record.get('password')
+        yield self.row(
+            'user',
+            id=user_id,
+            username=record.get('username', f'user{user_id}'),
+            email=record.get('email', f'user{user_id}@example.com'),
+            first_name=record.get('first_name', ''),
+            last_name=record.get('last_name', ''),
+            password=(
+                self.get_password(password) if password
+                else self.default_password
+            )
+        )
+
+    def build_tag(self, record):
+        tag_id = self.allocate(Tag, record.get('id'))
+        yield self.row(
+            'tag',
+            id=tag_id,
+            name=record.get('name', f'Тег {tag_id}'),
+            color=record.get(
+                'color',
+                f'#{tag_id * 2654435761 % 0x1000000:06X}'
+            ),
+            slug=record.get('slug', f'tag-{tag_id}')
+        )
+
+    def build_recipe(self, record):
+        recipe_id = self.allocate(Recipe, record.get('id'))
+        image = record.get('image', self.image)
+        yield self.row(
+            'recipe',
+            id=recipe_id,
+            author_id=record['author'],
+            name=record['name'],
+            text=record['text'],
+            cooking_time=record['cooking_time'],
+            image=image,
+            image_renditions=image if image == self.image else ''
+        )
+        for tag_id in record.get('tags', ()):
+            yield self.row('recipe_tag', recipe_id=recipe_id, tag_id=tag_id)
+        for ingredient in record.get('ingredients', ()):
+            yield self.row(
+                'recipe_ingredient',
+                recipe_id=recipe_id,
+                ingredient_id=ingredient['id'],
+                amount=ingredient['amount']
+            )
+
+    def build(self, kind, record):
+        if kind == 'user':
+            return self.build_user(record)
+        if kind == 'tag':
+            return self.build_tag(record)
+        if kind == 'recipe':
+            return self.build_recipe(record)
+        if kind == 'follow':
+            return [self.row(
+                kind,
+                user_id=record['user'],
+                author_id=record['author']
+            )]
+        return [self.row(
+            kind,
+            user_id=record['user'],
+            recipe_id=record['recipe']
+        )]
+
+    def read_jsonl(self, path):
+        try:
+            file = open(path, encoding='utf-8')
+        except OSError as error:
+            raise CommandError(f'Не удалось прочитать файл: {error}')
+        with file:
+            for number, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    kind = record.pop('model')
+                    if kind not in JSONL_MODELS:
+                        raise ValueError(f'неизвестная модель {kind}')
+                    yield from list(self.build(kind, record))
+                except (ValueError, KeyError, TypeError) as error:
+                    raise CommandError(f'Строка {number}: {error!r}')
+
+    def generate(self, options):
+        rng = self.rng
+        user_ids = range(
+            self.next_ids[User],
+            self.next_ids[User] + options['users']
+        )
+        for user_id in user_ids:
+            yield from self.build_user({
+                'first_name': rng.choice(FIRST_NAMES),
+                'last_name': rng.choice(LAST_NAMES)
+            })
+        for _ in range(options['tags']):
+            yield from self.build_tag({})
+        if options['recipes']:
+            yield from self.generate_recipes(options, user_ids)
+        recipe_ids = range(
+            self.next_ids[Recipe] - options['recipes'],
+            self.next_ids[Recipe]
+        )
+        if not recipe_ids:
+            recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+        for user_id in user_ids:
+            for author_id in self.sample(user_ids, options['follows'], user_id):
+                yield self.row('follow', user_id=user_id, author_id=author_id)
+            for kind in ('favorite', 'basket'):
+                for recipe_id in self.sample(recipe_ids, options[kind + 's']):
+                    yield self.row(kind, user_id=user_id, recipe_id=recipe_id)
+
+    def generate_recipes(self, options, user_ids):
+        rng = self.rng
+        author_ids = user_ids or list(
+            User.objects.values_list('id', flat=True)
+        )
+        tag_ids = sorted(set(Tag.objects.values_list('id', flat=True)) | set(range(
+            self.next_ids[Tag] - options['tags'],
+            self.next_ids[Tag]
+        )))
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        if not author_ids or not ingredient_ids:
+            raise CommandError(
+                'Для рецептов нужны пользователи и ингредиенты: '
+                'выполните parse_ingredients_csv и укажите --users'
+            )
+        ingredients = parse_range(options['ingredients'])
+        recipe_tags = parse_range(options['recipe_tags'])
+        for _ in range(options['recipes']):
+            yield from self.build_recipe({
+                'author': rng.choice(author_ids),
+                'name': f'{rng.choice(DISHES)} {rng.choice(ADDITIONS)}',
+                'text': ' '.join(rng.sample(SENTENCES, rng.randint(2, 5))),
+                'cooking_time': rng.randint(5, 180),
+                'tags': self.sample(tag_ids, rng.randint(*recipe_tags)),
+                'ingredients': [
+                    {'id': ingredient_id, 'amount': rng.randint(1, 500)}
+                    for ingredient_id in self.sample(
+                        ingredient_ids,
+                        rng.randint(*ingredients)
+                    )
+                ]
+            })
+
+    def sample(self, population, count, exclude=None):
+        count = min(count, len(population))
+        if not count:
+            return []
+        values = self.rng.sample(population, min(count + 1, len(population)))
+        return [value for value in values if value != exclude][:count]
+
+    def reset_sequences(self):
+        statements = connection.ops.sequence_reset_sql(
+            no_style(),
+            [User, Tag, Recipe]
+        )
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
@@ -1,29 +1,218 @@
 import csv
+import os
+from itertools import islice
+from time import monotonic
 
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
 
+from recipes.cache import INGREDIENTS_VERSION, bump_version
 from recipes.models import Ingredient
 
-PATH = "foodgram/data"
+PATH = os.path.join(settings.BASE_DIR, 'foodgram', 'data', 'ingredients.csv')
+
+COPY_SQL = '''
+CREATE TEMPORARY TABLE ingredients_import (
+    name text,
+    measurement_unit text
+) ON COMMIT DROP;
+'''
+
+UPSERT_SQL = '''
+INSERT INTO {table} ({name}, {unit})
+SELECT DISTINCT ON (trim(name)) trim(name), trim(measurement_unit)
+FROM ingredients_import
+WHERE trim(coalesce(name, '')) <> ''
+ON CONFLICT ({name}) DO {action}
+RETURNING xmax = 0
+'''
+
+UPDATE_ACTION = (
+    'UPDATE SET {unit} = EXCLUDED.{unit} '
+    'WHERE {table}.{unit} IS DISTINCT FROM EXCLUDED.{unit}'
+)
 
 
 class Command(BaseCommand):
     help = "Импорт из ingredients.csv"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=PATH,
+            help='Путь к CSV-файлу: наименование, единица измерения'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество строк в одном запросе'
+        )
+        parser.add_argument(
+            '--update',
+            action='store_true',
+            help='Обновлять единицу измерения у существующих ингредиентов'
+        )
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            help='Загрузить файл через COPY (только PostgreSQL)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Показать изменения, ничего не записывая'
+        )
+
     def handle(self, *args, **options):
-        with open(f'{PATH}/ingredients.csv', 'r') as file:
-            reader = csv.reader(file)
-            for row in reader:
-                name = row[0]
-                measurement_unit = row[1]
-                if name == 'пекарский порошок' and name == 'стейк семги' and name == 'цитроновые цукаты':
+        if options['batch_size'] < 1:
+            raise CommandError('Размер пакета должен быть больше нуля')
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('COPY доступен только для PostgreSQL')
+        started = monotonic()
+        try:
+            with open(options['path'], encoding='utf-8', newline='') as file:
+                with transaction.atomic():
+                    if options['copy'] and not options['dry_run']:
+                        counts = self.copy(file, options['update'])
+                    else:
+                        counts = self.load(file, options)
+        except OSError as error:
+            raise CommandError(f'Не удалось прочитать файл: {error}')
+        except DatabaseError as error:
+            raise CommandError(f'Импорт отменён: {error}')
+        if not options['dry_run'] and (counts['added'] or counts['updated']):
+            bump_version(INGREDIENTS_VERSION)
+        summary = (
+            'Ингредиенты: добавлено {added}, обновлено {updated}, '
+            'без изменений {unchanged}, пропущено {skipped} '
+            'за {elapsed:.2f} с'
+        ).format(elapsed=monotonic() - started, **counts)
+        if options['dry_run']:
+            summary = 'Пробный запуск. ' + summary
+        self.stdout.write(self.style.SUCCESS(summary))
+
+    def read_batches(self, file, batch_size, counts):
+        """Пакеты {наименование: единица}. Повторы наименования, в том
+        числе из прошлых пакетов, пропускаются, как и в COPY."""
+        reader = csv.reader(file)
+        seen = set()
+        while True:
+            rows = list(islice(reader, batch_size))
+            if not rows:
+                return
+            batch = {}
+            for row in rows:
+                if len(row) < 2 or not row[0].strip():
+                    counts['skipped'] += 1
                     continue
-                ingredient, created = Ingredient.objects.get_or_create(name=name, measurement_unit=measurement_unit)
-                if created:
-                    self.stdout.write(
-                        self.style.SUCCESS(f'Ингредиент добавлен "{name}" с единицей измерения "{measurement_unit}"')
-                    )
-                else:
+                name = row[0].strip()
+                if name in seen:
+                    counts['skipped'] += 1
+                    continue
+                seen.add(name)
+                batch[name] = row[1].strip()
+            yield batch
+
+    def insert(self, rows):
+        """Добавляет строки (наименование, единица), пропуская уже
+        существующие наименования, и возвращает число добавленных."""
+        quote = connection.ops.quote_name
+        fields = [
+            Ingredient._meta.get_field('name'),
+            Ingredient._meta.get_field('measurement_unit')
+        ]
+        batch_size = connection.ops.bulk_batch_size(fields, rows) or 1
+        added = 0
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                cursor.execute(
+                    '{insert} {table} ({name}, {unit}) VALUES {values} '
+                    '{on_conflict}'.format(
+                        insert=connection.ops.insert_statement(
+                            ignore_conflicts=True
+                        ),
+                        table=quote(Ingredient._meta.db_table),
+                        name=quote(fields[0].column),
+                        unit=quote(fields[1].column),
+                        values=', '.join(['(%s, %s)'] * len(batch)),
+                        on_conflict=connection.ops.ignore_conflicts_suffix_sql(
+                            ignore_conflicts=True
+                        )
+                    ),
+                    [value for row in batch for value in row]
+                )
+                added += cursor.rowcount
+        return added
+
+    def load(self, file, options):
+        counts = dict(added=0, updated=0, unchanged=0, skipped=0)
+        for batch in self.read_batches(file, options['batch_size'], counts):
+            existing = {
+                ingredient.name: ingredient
+                for ingredient in Ingredient.objects.filter(name__in=batch)
+            }
+            new = [
+                (name, unit) for name, unit in batch.items()
+                if name not in existing
+            ]
+            changed = []
+            for name, unit in batch.items():
+                ingredient = existing.get(name)
+                if ingredient is None:
+                    continue
+                if not options['update'] or ingredient.measurement_unit == unit:
+                    counts['unchanged'] += 1
+                    continue
+                if options['dry_run']:
                     self.stdout.write(
-                        self.style.WARNING(f'Ингредиент "{name}" с единицей измерения "{measurement_unit}" не добавлен')
+                        f'~ {name}: {ingredient.measurement_unit} -> {unit}'
                     )
+                ingredient.measurement_unit = unit
+                changed.append(ingredient)
+            if options['dry_run']:
+                for name, unit in new:
+                    self.stdout.write(f'+ {name} ({unit})')
+                added = len(new)
+            else:
+                # Наименования, которые успела добавить параллельная
+                # загрузка, не вставляются и считаются без изменений.
+                added = self.insert(new)
+                Ingredient.objects.bulk_update(changed, ['measurement_unit'])
+            counts['added'] += added
+            counts['unchanged'] += len(new) - added
+            counts['updated'] += len(changed)
+        return counts
+
+    def copy(self, file, update):
+        quote = connection.ops.quote_name
+        names = dict(
+            table=quote(Ingredient._meta.db_table),
+            name=quote(Ingredient._meta.get_field('name').column),
+            unit=quote(Ingredient._meta.get_field('measurement_unit').column)
+        )
+        action = UPDATE_ACTION.format(**names) if update else 'NOTHING'
+        with connection.cursor() as cursor:
+            cursor.execute(COPY_SQL)
+            with connection.wrap_database_errors:
+                cursor.copy_expert(
+                    'COPY ingredients_import FROM STDIN WITH (FORMAT csv)',
+                    file
+                )
+            cursor.execute(
+                'SELECT count(*), count(DISTINCT trim(name)) '
+                'FILTER (WHERE trim(name) <> \'\') FROM ingredients_import'
+            )
+            total, distinct = cursor.fetchone()
+            cursor.execute(UPSERT_SQL.format(action=action, **names))
+            inserted = [row[0] for row in cursor.fetchall()]
+        added = sum(inserted)
+        updated = len(inserted) - added
+        return dict(
+            added=added,
+            updated=updated,
+            unchanged=distinct - added - updated,
+            skipped=total - distinct
+        )
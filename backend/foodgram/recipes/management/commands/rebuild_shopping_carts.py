@@ -0,0 +1,54 @@
+from time import monotonic
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.cart import check_totals, rebuild_totals
+from recipes.models import ShoppingCartItem
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт итогов по ингредиентам в корзинах пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сравнить итоги с агрегацией по корзинам'
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='users',
+            help='Пересчитать или проверить корзину только этого пользователя'
+        )
+
+    def handle(self, *args, **options):
+        started = monotonic()
+        if options['check']:
+            self.check_totals(options['users'])
+            return
+        with transaction.atomic():
+            rebuild_totals(options['users'])
+        items = ShoppingCartItem.objects.all()
+        if options['users']:
+            items = items.filter(user__in=options['users'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Итоги пересчитаны: {items.count()} строк '
+            f'за {monotonic() - started:.2f} с'
+        ))
+
+    def check_totals(self, users):
+        mismatches = check_totals(users)
+        for user, ingredient, expected, stored in mismatches[:20]:
+            self.stdout.write(
+                f'пользователь {user}, ингредиент {ingredient}: '
+                f'ожидается {expected}, сохранено {stored}'
+            )
+        if mismatches:
+            raise CommandError(
+                f'Расхождений: {len(mismatches)}, '
+                'выполните rebuild_shopping_carts'
+            )
+        self.stdout.write(self.style.SUCCESS('Итоги совпадают с корзинами'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import recount
+
+
+class Command(BaseCommand):
+    help = "Пересчёт счётчиков избранного, рецептов и подписчиков"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            repaired = recount()
+        self.stdout.write(self.style.SUCCESS(
+            'Исправлено записей: ' + ', '.join(
+                f'{field}={count}' for field, count in repaired.items()
+            )
+        ))
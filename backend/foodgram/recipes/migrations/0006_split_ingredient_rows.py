@@ -0,0 +1,62 @@
+# Данные переносятся отдельной миграцией: на PostgreSQL изменение
+# таблиц после вставки строк в той же транзакции завершается ошибкой
+# "pending trigger events" (ограничения внешних ключей отложены).
+
+from django.db import migrations
+
+
+def split_shared_rows(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    IngredientRecipe = apps.get_model('recipes', 'IngredientRecipe')
+    amounts = {}
+    links = Recipe.ingredients.through.objects.values_list(
+        'recipe_id',
+        'ingredientrecipe__ingredient_id',
+        'ingredientrecipe__amount'
+    )
+    for recipe_id, ingredient_id, amount in links.iterator():
+        key = (recipe_id, ingredient_id)
+        amounts[key] = amounts.get(key, 0) + amount
+    IngredientRecipe.objects.all().delete()
+    IngredientRecipe.objects.bulk_create(
+        (IngredientRecipe(recipe_id=recipe_id,
+                          ingredient_id=ingredient_id,
+                          amount=amount)
+         for (recipe_id, ingredient_id), amount in amounts.items()),
+        batch_size=1000
+    )
+
+
+def merge_shared_rows(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    IngredientRecipe = apps.get_model('recipes', 'IngredientRecipe')
+    Through = Recipe.ingredients.through
+    rows = list(IngredientRecipe.objects.filter(
+        recipe__isnull=False
+    ).values_list('recipe_id', 'ingredient_id', 'amount'))
+    IngredientRecipe.objects.filter(recipe__isnull=False).delete()
+    shared = {}
+    links = []
+    for recipe_id, ingredient_id, amount in rows:
+        key = (ingredient_id, amount)
+        if key not in shared:
+            shared[key] = IngredientRecipe.objects.create(
+                ingredient_id=ingredient_id,
+                amount=amount
+            )
+        links.append(Through(
+            recipe_id=recipe_id,
+            ingredientrecipe_id=shared[key].id
+        ))
+    Through.objects.bulk_create(links, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_ingredientrecipe_recipe'),
+    ]
+
+    operations = [
+        migrations.RunPython(split_shared_rows, merge_shared_rows),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.17 on 2026-10-18 06:39
+
+from django.db import migrations, models
+import recipes.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_favorites_count'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(help_text='Добавьте картинку рецепта', storage=recipes.storage.ContentAddressedStorage(), upload_to='recipes/images/', verbose_name='Картинка рецепта'),
+        ),
+    ]
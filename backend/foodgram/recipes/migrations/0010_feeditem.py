@@ -0,0 +1,53 @@
+# Generated by Django 3.2.17 on 2026-10-18 06:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_feed(apps, schema_editor):
+    FeedItem = apps.get_model('recipes', 'FeedItem')
+    Follow = apps.get_model('users', 'Follow')
+    quote = schema_editor.connection.ops.quote_name
+    sql, params = Follow.objects.filter(
+        author__recipes__isnull=False
+    ).values_list('user_id', 'author__recipes__id').query.sql_with_params()
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO {} ({}, {}) {}'.format(
+                quote(FeedItem._meta.db_table),
+                quote(FeedItem._meta.get_field('user').column),
+                quote(FeedItem._meta.get_field('recipe').column),
+                sql
+            ),
+            params
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('users', '0002_user_counters'),
+        ('recipes', '0009_recipe_image_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_items', to='recipes.recipe', verbose_name='Рецепт автора, на которого подписан пользователь')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_items', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты подписок',
+                'verbose_name_plural': 'Лента подписок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='feeditem',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='Рецепт попадает в ленту пользователя один раз'),
+        ),
+        migrations.RunPython(fill_feed, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 3.2.17 on 2026-10-18 07:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_totals(apps, schema_editor):
+    IngredientRecipe = apps.get_model('recipes', 'IngredientRecipe')
+    ShoppingCartItem = apps.get_model('recipes', 'ShoppingCartItem')
+    quote = schema_editor.connection.ops.quote_name
+    meta = ShoppingCartItem._meta
+    sql, params = IngredientRecipe.objects.filter(
+        recipe__baskets__isnull=False
+    ).values('recipe__baskets__user', 'ingredient').annotate(
+        total=models.Sum('amount')
+    ).values_list(
+        'recipe__baskets__user', 'ingredient', 'total'
+    ).order_by().query.sql_with_params()
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO {} ({}, {}, {}) {}'.format(
+                quote(meta.db_table),
+                quote(meta.get_field('user').column),
+                quote(meta.get_field('ingredient').column),
+                quote(meta.get_field('amount').column),
+                sql
+            ),
+            params
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0010_feeditem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingCartItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField(verbose_name='Общее количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_cart_items', to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_cart_items', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Итог по ингредиенту в Корзине',
+                'verbose_name_plural': 'Итоги по Корзине',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcartitem',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='Итог по ингредиенту в Корзине хранится один раз'),
+        ),
+        migrations.RunPython(fill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 3.2.17 on 2026-10-18 08:02
+
+import posixpath
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_renditions(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    storage = Recipe._meta.get_field('image').storage
+    for name in Recipe.objects.exclude(image='').values_list(
+        'image', flat=True
+    ).distinct():
+        directory, filename = posixpath.split(name)
+        if all(
+            storage.exists(posixpath.join(
+                directory,
+                'renditions',
+                posixpath.splitext(filename)[0],
+                f'{rendition}.webp'
+            ))
+            for rendition in settings.IMAGE_RENDITIONS
+        ):
+            Recipe.objects.filter(image=name).update(image_renditions=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_renditions',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Картинка, для которой готовы уменьшенные копии'),
+        ),
+        migrations.RunPython(mark_renditions, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,9 @@
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 from django.db import models
+from foodgram.managers import RelationManager
 
+from .storage import image_storage
 
 User = get_user_model()
 
@@ -59,31 +61,6 @@ class Ingredient(models.Model):
         return self.name
 
 
-class IngredientRecipe(models.Model):
-    ingredient = models.ForeignKey(
-        Ingredient,
-        on_delete=models.CASCADE,
-        verbose_name='Ингредиент, связанный с рецептом'
-    )
-    amount = models.PositiveIntegerField(
-        'Количество',
-        validators=(MinValueValidator(1),)
-    )
-
-    class Meta:
-        verbose_name = 'Ингредиенты с количеством'
-        verbose_name_plural = 'Ингредиенты с количеством'
-        constraints = [
-            models.UniqueConstraint(
-                fields=('ingredient', 'amount'),
-                name='Связь ингредиента и его количества должна быть уникальна'
-            )
-        ]
-
-    def __str__(self):
-        return f'Ингредиент {self.ingredient} в количестве {self.amount}'
-
-
 class Recipe(models.Model):
     name = models.CharField(
         'Наименование рецепта',
@@ -97,13 +74,21 @@ class Recipe(models.Model):
     image = models.ImageField(
         'Картинка рецепта',
         upload_to='recipes/images/',
+        storage=image_storage,
         help_text='Добавьте картинку рецепта'
     )
+    image_renditions = models.CharField(
+        'Картинка, для которой готовы уменьшенные копии',
+        max_length=100,
+        blank=True,
+        editable=False
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name='recipes',
-        verbose_name='Автор рецепта'
+        verbose_name='Автор рецепта',
+        db_index=False
     )
     tags = models.ManyToManyField(
         Tag,
@@ -111,7 +96,8 @@ class Recipe(models.Model):
         related_name='recipes'
     )
     ingredients = models.ManyToManyField(
-        IngredientRecipe,
+        Ingredient,
+        through='IngredientRecipe',
         verbose_name='Ингредиенты',
         related_name='recipes'
     )
@@ -120,33 +106,84 @@ class Recipe(models.Model):
         validators=(MinValueValidator(1),),
         help_text='Укажите время приготовления рецепта (в минутах)'
     )
+    favorites_count = models.PositiveIntegerField(
+        'Количество добавлений в Избранное',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         ordering = ('-id',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(fields=('author', '-id'), name='recipe_author_id_idx')
+        ]
 
     def __str__(self):
         return self.name
 
 
+class IngredientRecipe(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='recipe_ingredients',
+        verbose_name='Рецепт',
+        db_index=False
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент, связанный с рецептом'
+    )
+    amount = models.PositiveIntegerField(
+        'Количество',
+        validators=(MinValueValidator(1),)
+    )
+
+    class Meta:
+        verbose_name = 'Ингредиенты с количеством'
+        verbose_name_plural = 'Ингредиенты с количеством'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('recipe', 'ingredient'),
+                name='Ингредиент не должен повторяться в рецепте'
+            )
+        ]
+
+    def __str__(self):
+        return f'Ингредиент {self.ingredient} в количестве {self.amount}'
+
+
 class Favorites(models.Model):
     user = models.ForeignKey(
         User,
         related_name='favorites',
         on_delete=models.CASCADE,
-        verbose_name='Пользователь, добавляющий продукты в Избранное'
+        verbose_name='Пользователь, добавляющий продукты в Избранное',
+        db_index=False
     )
     recipe = models.ForeignKey(
         Recipe,
         related_name='favorites',
         on_delete=models.CASCADE,
-        verbose_name='Рецепт, добавленный в Избранное'
+        verbose_name='Рецепт, добавленный в Избранное',
+        db_index=False
     )
 
+    objects = models.Manager()
+    relations = RelationManager('recipe')
+
     class Meta:
         verbose_name = 'Избранное'
         verbose_name_plural = 'Избранное'
+        indexes = [
+            models.Index(
+                fields=('recipe', 'user'),
+                name='favorites_recipe_user_idx'
+            )
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=('user', 'recipe'),
@@ -163,18 +200,29 @@ class Basket(models.Model):
         User,
         related_name='baskets',
         on_delete=models.CASCADE,
-        verbose_name='Пользователь, добавляющий рецепты в корзину'
+        verbose_name='Пользователь, добавляющий рецепты в корзину',
+        db_index=False
     )
     recipe = models.ForeignKey(
         Recipe,
         related_name='baskets',
         on_delete=models.CASCADE,
-        verbose_name='Рецепты, добавленные в Корзину'
+        verbose_name='Рецепты, добавленные в Корзину',
+        db_index=False
     )
 
+    objects = models.Manager()
+    relations = RelationManager('recipe')
+
     class Meta:
         verbose_name = 'Корзина'
         verbose_name_plural = 'Корзина'
+        indexes = [
+            models.Index(
+                fields=('recipe', 'user'),
+                name='basket_recipe_user_idx'
+            )
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=('user', 'recipe'),
@@ -184,3 +232,62 @@ class Basket(models.Model):
 
     def __str__(self):
         return f'{self.user} добавил в Корзину рецепт {self.recipe}'
+
+
+class FeedItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        related_name='feed_items',
+        on_delete=models.CASCADE,
+        verbose_name='Подписчик',
+        db_index=False
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        related_name='feed_items',
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт автора, на которого подписан пользователь'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Лента подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='Рецепт попадает в ленту пользователя один раз'
+            )
+        ]
+
+    def __str__(self):
+        return f'Рецепт {self.recipe} в ленте {self.user}'
+
+
+class ShoppingCartItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        related_name='shopping_cart_items',
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        db_index=False
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        related_name='shopping_cart_items',
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент'
+    )
+    amount = models.IntegerField('Общее количество')
+
+    class Meta:
+        verbose_name = 'Итог по ингредиенту в Корзине'
+        verbose_name_plural = 'Итоги по Корзине'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='Итог по ингредиенту в Корзине хранится один раз'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.ingredient} в Корзине {self.user}: {self.amount}'
@@ -0,0 +1,97 @@
+from bisect import bisect_left
+from threading import Lock
+
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connections
+from django.db.models import BooleanField, Case, Value, When
+from foodgram.metrics import count_cache
+
+from .cache import INGREDIENTS_VERSION, get_version
+from .models import Ingredient
+
+
+def trigrams(value):
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+class IngredientIndex:
+    """Индекс ингредиентов в памяти процесса для автодополнения.
+
+    Ищет сначала совпадения по началу названия, затем по подстроке.
+    Сбрасывается сигналами модели Ingredient, а в других процессах —
+    по изменению версии в общем кеше.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._version = None
+        self._data = None
+
+    def invalidate(self):
+        self._data = None
+
+    def _build(self):
+        ingredients = sorted(
+            Ingredient.objects.all(),
+            key=lambda ingredient: ingredient.name.casefold()
+        )
+        names = [ingredient.name.casefold() for ingredient in ingredients]
+        index = {}
+        for position, name in enumerate(names):
+            for trigram in trigrams(name):
+                index.setdefault(trigram, set()).add(position)
+        return ingredients, names, index
+
+    def _get_data(self):
+        version = get_version(INGREDIENTS_VERSION)
+        data = self._data
+        if data is not None and self._version == version:
+            count_cache('ingredient_index', hits=1)
+            return data
+        with self._lock:
+            if self._data is None or self._version != version:
+                count_cache('ingredient_index', misses=1)
+                self._data = self._build()
+                self._version = version
+            return self._data
+
+    def search(self, query):
+        ingredients, names, index = self._get_data()
+        query = query.casefold()
+        start = bisect_left(names, query)
+        end = start
+        while end < len(names) and names[end].startswith(query):
+            end += 1
+        if len(query) < 3:
+            candidates = range(len(names))
+        else:
+            postings = sorted(
+                (index.get(trigram, set()) for trigram in trigrams(query)),
+                key=len
+            )
+            candidates = sorted(set.intersection(*postings))
+        contains = [
+            position for position in candidates
+            if not start <= position < end and query in names[position]
+        ]
+        return ingredients[start:end] + [
+            ingredients[position] for position in contains
+        ]
+
+
+ingredient_index = IngredientIndex()
+
+
+def ranked_search(queryset, value, field='name'):
+    queryset = queryset.filter(**{f'{field}__icontains': value}).annotate(
+        is_prefix=Case(
+            When(**{f'{field}__istartswith': value}, then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField()
+        )
+    )
+    if connections[queryset.db].vendor != 'postgresql':
+        return queryset.order_by('-is_prefix', field)
+    return queryset.annotate(
+        similarity=TrigramSimilarity(field, value)
+    ).order_by('-is_prefix', '-similarity', field)
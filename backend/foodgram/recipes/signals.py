@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import (INGREDIENTS_VERSION, RECIPE_VERSION, RECIPES_VERSION,
+                    TAGS_VERSION, USER_VERSION, bump_version,
+                    bump_version_now_and_on_commit, invalidate)
+from .cart import rebuild_totals
+from .feed import fan_out
+from .images import schedule_renditions
+from .models import Basket, Ingredient, Recipe, Tag
+from .search import ingredient_index
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_index(**kwargs):
+    ingredient_index.invalidate()
+    transaction.on_commit(lambda: bump_version(INGREDIENTS_VERSION))
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tags(**kwargs):
+    invalidate(TAGS_VERSION)
+
+
+@receiver(post_save, sender=Basket)
+def rebuild_shopping_cart(instance, **kwargs):
+    """Корзины, сохранённые не через API, например в админке. Удаления
+    сюда не попадают: каскад по рецепту вызвал бы пересчёт на каждую
+    строку, итоги вычитают perform_destroy и админка."""
+    rebuild_totals([instance.user_id])
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_recipes(**kwargs):
+    transaction.on_commit(lambda: bump_version(RECIPES_VERSION))
+
+
+@receiver(post_save, sender=Recipe)
+def invalidate_recipe(instance, **kwargs):
+    bump_version_now_and_on_commit(RECIPE_VERSION.format(instance.id))
+    transaction.on_commit(lambda: schedule_renditions(instance))
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: fan_out(instance))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_recipe_relations(instance, reverse, pk_set, **kwargs):
+    recipe_ids = (pk_set or ()) if reverse else (instance.id,)
+    for recipe_id in recipe_ids:
+        bump_version_now_and_on_commit(RECIPE_VERSION.format(recipe_id))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_author(instance, update_fields, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    bump_version_now_and_on_commit(USER_VERSION.format(instance.id))
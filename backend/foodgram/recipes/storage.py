@@ -0,0 +1,22 @@
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, в котором имя файла однозначно задаётся его содержимым:
+    повторная загрузка того же файла не создаёт копию."""
+
+    def get_available_name(self, name, max_length=None):
+        if self.exists(name):
+            raise FileExistsError(name)
+        return name
+
+    def save(self, name, content, max_length=None):
+        try:
+            return super().save(name, content, max_length)
+        except FileExistsError:
+            return name
+
+
+image_storage = ContentAddressedStorage()
@@ -0,0 +1,55 @@
+from decimal import Decimal
+from functools import lru_cache
+
+# Единицы из ingredients.csv, которые переводятся друг в друга:
+# единица -> (базовая единица, сколько в ней базовых).
+UNITS = {
+    'г': ('г', 1),
+    'кг': ('г', 1000),
+    'мл': ('мл', 1),
+    'л': ('мл', 1000),
+    'ч. л.': ('ч. л.', 1),
+    'ст. л.': ('ч. л.', 3),
+}
+WITHOUT_AMOUNT = {'по вкусу'}
+PRECISION = Decimal('0.001')
+
+LARGER_UNITS = {
+    base: sorted(
+        (factor, unit) for unit, (unit_base, factor) in UNITS.items()
+        if unit_base == base and factor > 1
+    )[::-1]
+    for base, _ in UNITS.values()
+}
+
+
+@lru_cache(maxsize=None)
+def normalize_unit(unit):
+    """'Ст.л.' -> 'ст. л.'"""
+    return ' '.join(unit.lower().replace('.', '. ').split())
+
+
+def to_base(unit, amount):
+    base, factor = UNITS.get(normalize_unit(unit), (unit, 1))
+    return base, amount * factor
+
+
+def humanize(unit, amount):
+    """Единица и количество для списка покупок: 1500 г -> 1,5 кг,
+    9 ч. л. -> 3 ст. л. Крупная единица выбирается, только если
+    количество в ней не меньше единицы и записывается точно."""
+    normalized = normalize_unit(unit)
+    if normalized in WITHOUT_AMOUNT:
+        return unit, None
+    if normalized not in UNITS:
+        return unit, Decimal(amount)
+    base, amount = to_base(normalized, Decimal(amount))
+    for factor, larger in LARGER_UNITS[base]:
+        value = amount / factor
+        if value >= 1 and value == value.quantize(PRECISION):
+            return larger, value
+    return base, amount
+
+
+def format_amount(amount):
+    return f'{amount.normalize():f}'.replace('.', ',')
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.17 on 2026-10-18 07:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def stop_fan_out(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    User.objects.filter(
+        followers_count__gt=settings.FEED_FAN_OUT_MAX_FOLLOWERS
+    ).update(feed_fan_out=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='feed_fan_out',
+            field=models.BooleanField(default=True, editable=False, verbose_name='Рецепты раскладываются по лентам подписчиков'),
+        ),
+        migrations.RunPython(stop_fan_out, migrations.RunPython.noop),
+    ]
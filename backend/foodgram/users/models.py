@@ -1,6 +1,7 @@
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.db import models
+from foodgram.managers import RelationManager
 
 
 class User(AbstractUser):
@@ -35,6 +36,21 @@ class User(AbstractUser):
         help_text='Укажите электронную почту',
         unique=True
     )
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов',
+        default=0,
+        editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+        editable=False
+    )
+    feed_fan_out = models.BooleanField(
+        'Рецепты раскладываются по лентам подписчиков',
+        default=True,
+        editable=False
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username',)
@@ -53,20 +69,31 @@ class Follow(models.Model):
         User,
         verbose_name='Подписчик',
         related_name='following',
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False
     )
     author = models.ForeignKey(
         User,
         verbose_name='Автор',
         related_name='follower',
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False
     )
 
+    objects = models.Manager()
+    relations = RelationManager('author')
+
     class Meta:
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
 
     class Meta:
+        indexes = (
+            models.Index(
+                fields=('author', 'user'),
+                name='follow_author_user_idx'
+            ),
+        )
         constraints = (
             models.CheckConstraint(
                 check=~models.Q(user=models.F('author')),
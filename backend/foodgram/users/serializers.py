@@ -3,6 +3,7 @@ from re import match
 import api.serializers
 from django.contrib.auth import get_user_model
 from djoser.serializers import UserCreateSerializer, UserSerializer
+from foodgram.profiling import ProfiledDataMixin, ProfiledListSerializer
 from rest_framework.serializers import (BooleanField, ModelSerializer,
                                         SerializerMethodField, ValidationError)
 from rest_framework.status import HTTP_400_BAD_REQUEST
@@ -12,6 +13,13 @@ from .models import Follow
 User = get_user_model()
 
 
+def get_recipes_limit(request):
+    recipes_limit = request.query_params.get('recipes_limit', '')
+    if recipes_limit.isdigit():
+        return int(recipes_limit)
+    return None
+
+
 class CustomUserCreateSerializer(UserCreateSerializer):
     class Meta:
         model = User
@@ -49,13 +57,15 @@ class CustomUserSerializer(UserSerializer):
         request = self.context.get('request')
         if request.user.is_anonymous:
             return False
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         return Follow.objects.filter(
             user=request.user,
             author=obj
         ).exists()
 
 
-class FollowSerializer(ModelSerializer):
+class FollowSerializer(ProfiledDataMixin, ModelSerializer):
     recipes = SerializerMethodField(method_name='get_recipes')
     recipes_count = SerializerMethodField(source='recipes.count',
                                           read_only=True)
@@ -74,16 +84,18 @@ class FollowSerializer(ModelSerializer):
             'recipes_count'
         )
         read_only_fields = ('email', 'username', 'first_name', 'last_name')
+        list_serializer_class = ProfiledListSerializer
 
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        recipes_limit = request.GET.get('recipes_limit')
-        recipes = obj.recipes.all()
-        if recipes_limit:
-            recipes = recipes[:int(recipes_limit)]
+        if hasattr(obj, 'preview_recipes'):
+            recipes = obj.preview_recipes
+        else:
+            recipes = obj.recipes.all()[
+                :get_recipes_limit(self.context.get('request'))
+            ]
         serializer = api.serializers.ShortRecipeSerializer(
             recipes,
             many=True,
@@ -108,18 +120,4 @@ class FollowSerializer(ModelSerializer):
                 detail='Вы не можете подписаться на себя',
                 code=HTTP_400_BAD_REQUEST
             )
-        if Follow.objects.filter(
-            user=user,
-            author=author
-        ).exists():
-            raise ValidationError(
-                detail=('Вы не можете подписаться '
-                        'на другого пользователя повторно'),
-                code=HTTP_400_BAD_REQUEST
-            )
         return data
-
-    def create(self, validated_data):
-        user = self.context.get('request').user
-        author = validated_data.get('author')
-        return Follow.objects.create(user=user, author=author)
@@ -1,29 +1,60 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Prefetch, Window, prefetch_related_objects
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.status import (HTTP_201_CREATED, HTTP_204_NO_CONTENT,
                                    HTTP_400_BAD_REQUEST)
 
 from api.permissions import IsAuthenticatedOrAdmin
+from recipes.counters import change_counter
+from recipes.feed import follow, unfollow
+from recipes.models import Recipe
 
 from .models import Follow
-from .serializers import CustomUserSerializer, FollowSerializer
+from .serializers import (CustomUserSerializer, FollowSerializer,
+                          get_recipes_limit)
 
 User = get_user_model()
 
 
+def get_recipes_preview(authors, limit):
+    recipes = Recipe.objects.all()
+    if limit is None:
+        return recipes
+    ranked = Recipe.objects.filter(author__in=authors).annotate(
+        row_number=Window(
+            expression=RowNumber(),
+            partition_by=[F('author')],
+            order_by=F('id').desc()
+        )
+    ).order_by().values('id', 'row_number')
+    sql, params = ranked.query.sql_with_params()
+    return recipes.filter(id__in=RawSQL(
+        f'SELECT ranked.id FROM ({sql}) ranked '
+        f'WHERE ranked.row_number <= %s',
+        (*params, limit)
+    ))
+
+
 class CustomUserViewSet(UserViewSet):
     queryset = User.objects.all()
     serializer_class = CustomUserSerializer
 
     @action(detail=False, permission_classes=(IsAuthenticatedOrAdmin,))
     def subscriptions(self, request):
-        follow_objects = Follow.objects.filter(user=request.user)
-        followed_user_ids = [follow.author.id for follow in follow_objects]
-        follows = User.objects.filter(id__in=followed_user_ids)
+        follows = User.objects.filter(follower__user=request.user)
         pages = self.paginate_queryset(follows)
+        prefetch_related_objects(pages, Prefetch(
+            'recipes',
+            queryset=get_recipes_preview(pages, get_recipes_limit(request)),
+            to_attr='preview_recipes'
+        ))
         serializer = FollowSerializer(
             pages,
             many=True,
@@ -44,24 +75,37 @@ class CustomUserViewSet(UserViewSet):
         )
         if not serializer.is_valid():
             return Response(serializer.errors, status=HTTP_400_BAD_REQUEST)
-        data = {'author': author}
-        serializer.create(data)
-        serializer.save()
+        with transaction.atomic():
+            added = Follow.relations.add(request.user.id, author.id)
+            if added:
+                change_counter(
+                    User.objects.filter(id=author.id), 'followers_count', 1
+                )
+                follow(request.user.id, author.id)
+        if not added:
+            return Response(
+                {api_settings.NON_FIELD_ERRORS_KEY: [
+                    'Вы не можете подписаться '
+                    'на другого пользователя повторно'
+                ]},
+                status=HTTP_400_BAD_REQUEST
+            )
         return Response(serializer.data, status=HTTP_201_CREATED)
 
     @subscribe.mapping.delete
     def delete_subscribe(self, request, **kwargs):
-        author = get_object_or_404(User, id=self.kwargs.get('id'))
-        if not Follow.objects.filter(
-                user=request.user,
-                author=author
-        ).exists():
+        author_id = self.kwargs.get('id')
+        with transaction.atomic():
+            removed = Follow.relations.remove(request.user.id, author_id)
+            if removed:
+                change_counter(
+                    User.objects.filter(id=author_id), 'followers_count', -1
+                )
+                unfollow(request.user.id, author_id)
+        if not removed:
+            get_object_or_404(User, id=author_id)
             return Response(
                 {'errors': 'Данная подписка не существует'},
                 status=HTTP_400_BAD_REQUEST
             )
-        Follow.objects.filter(
-            user=request.user,
-            author=author
-        ).delete()
         return Response(status=HTTP_204_NO_CONTENT)